@@ -0,0 +1,139 @@
+"""Resolve several artists in one tool call.
+
+"Compare the 2025 tours of A, B and C" used to cost one ``getArtists`` call,
+and one model round trip, per artist. ``resolve_artists`` takes the whole
+list of names and/or MBIDs:
+
+- MBIDs are fetched with ``/artist/{mbid}``; names are answered from the
+  ``ArtistIndex`` for a recorded relevance search or a single artist with
+  that exact name or alias, and searched upstream (best match by relevance)
+  otherwise, feeding the index. Fuzzy index candidates are only offered as
+  suggestions when upstream finds nothing;
+- at most ``max_concurrency`` artists are resolved at a time, through the
+  server's client and thus its response cache, deadline and rate limit: the
+  client's ``RateLimitTransport`` (``rate_limit.py``) keeps the requests sent
+  upstream under the setlist.fm limit, however fast cache misses come back;
+- each item carries either the compact artist (MBID, name, disambiguation) or
+  its own error, one failure never fails the batch;
+- ``on_item`` is awaited as each item completes, the server tool uses it for
+  progress notifications and partial results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from opentelemetry import metrics
+
+from artist_index import ArtistIndex, ArtistMatch
+from serialization import loads
+from upstream_cache import is_mbid
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ARTISTS = int(os.getenv("BATCH_MAX_ARTISTS", "25"))
+# Artists in flight; the upstream request rate is bounded by the client's rate limiter.
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+meter = metrics.get_meter("artist_batch")
+resolved = meter.create_counter("artist_batch.items", description="Artists resolved by batch lookups, by source")
+
+
+def _compact(artist: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: artist[key] for key in ("mbid", "name", "sortName", "disambiguation", "url") if artist.get(key)}
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        return loads(response.content).get("message") or response.reason_phrase
+    except (ValueError, AttributeError):
+        return response.reason_phrase
+
+
+async def _resolve(client: httpx.AsyncClient, index: Optional[ArtistIndex], query: str) -> Dict[str, Any]:
+    item: Dict[str, Any] = {"query": query}
+    if is_mbid(query):
+        response = await client.get(f"/1.0/artist/{query}")
+        if response.status_code == 404:
+            return {**item, "error": "No artist with this MBID"}
+        if response.status_code != 200:
+            return {**item, "error": f"HTTP {response.status_code}: {_error_message(response)}"}
+        return {**item, "artist": _compact(loads(response.content)), "source": "upstream"}
+
+    match = await asyncio.to_thread(index.lookup, query, "relevance") if index is not None else None
+    if match is not None and match.confident:
+        found = {**item, "artist": _compact(match.artists[0]), "source": f"index.{match.kind}"}
+        return {**found, "candidates": match.total} if match.total is not None else found
+
+    response = await client.get("/1.0/search/artists", params={"artistName": query, "sort": "relevance", "p": 1})
+    if response.status_code == 404:
+        return _not_found(item, match)
+    if response.status_code != 200:
+        return {**item, "error": f"HTTP {response.status_code}: {_error_message(response)}"}
+    document = loads(response.content)
+    artists = document.get("artist") or []
+    if not artists:
+        return _not_found(item, match)
+    total = int(document.get("total") or len(artists))
+    if index is not None:
+        await asyncio.to_thread(index.add_search, query, "relevance", artists, total, int(document.get("itemsPerPage") or 30))
+    return {**item, "artist": _compact(artists[0]), "source": "upstream", "candidates": total}
+
+
+def _not_found(item: Dict[str, Any], match: Optional[ArtistMatch]) -> Dict[str, Any]:
+    if match is not None and match.kind == "fuzzy":
+        return {**item, "error": "No artist found", "suggestions": [_compact(artist) for artist in match.artists[:3]]}
+    return {**item, "error": "No artist found"}
+
+
+async def resolve_artists(
+    client: httpx.AsyncClient,
+    queries: List[str],
+    index: Optional[ArtistIndex] = None,
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    on_item: Optional[Callable[[int, int, Dict[str, Any]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """Resolve artist names or MBIDs concurrently.
+
+    Args:
+        client: The server's setlist.fm client, rate limited by its transport
+        queries: Artist names or MBIDs, at most ``BATCH_MAX_ARTISTS``
+        index: Artist index consulted before searching upstream
+        max_concurrency: Maximum number of artists resolved at the same time
+        on_item: Coroutine called with (items done, items in total, item) as each item completes
+
+    Returns:
+        ``{"artists": [...], "resolved": n, "failed": n}``, items in the order of ``queries``
+    """
+    queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+    if len(queries) > BATCH_MAX_ARTISTS:
+        raise ValueError(f"At most {BATCH_MAX_ARTISTS} artists per call, got {len(queries)}")
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    done = 0
+
+    async def run(query: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                item = await _resolve(client, index, query)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Batch lookup of %r failed: %s", query, exc)
+                item = {"query": query, "error": str(exc) or type(exc).__name__}
+        resolved.add(1, {"source": item.get("source", "error")})
+        if on_item is not None:
+            nonlocal done
+            done += 1
+            await on_item(done, len(queries), item)
+        return item
+
+    start = time.perf_counter()
+    items = await asyncio.gather(*(run(query) for query in queries))
+    failed = sum("error" in item for item in items)
+    logger.info("Resolved %d artists (%d failed) in %.0f ms", len(items), failed, (time.perf_counter() - start) * 1000)
+    return {"artists": list(items), "resolved": len(items) - failed, "failed": failed}
@@ -0,0 +1,86 @@
+"""Crawl the whole setlist history of an artist, page after page.
+
+``crawl_artist_history`` backs the ``getArtistHistory`` tool: it walks every
+``/artist/{mbid}/setlists`` page (newest first, up to ``max_pages``), feeds
+each show to ``SetlistAnalytics`` and returns the aggregates instead of the
+raw pages. Progress is reported per page and every page's shows are sent as a
+partial result (``partial_results.py``), so a client can render the first
+shows after one round trip and cancel once it has seen enough.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from partial_results import ProgressReporter
+from setlist_analytics import SetlistAnalytics
+from setlistfm_models import Setlists, decode
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MAX_PAGES = int(os.getenv("HISTORY_MAX_PAGES", "50"))
+
+PageFetcher = Callable[[str, int], Awaitable[Dict[str, Any]]]
+
+
+async def crawl_artist_history(
+    fetch_page: PageFetcher,
+    mbid: str,
+    reporter: ProgressReporter,
+    max_pages: int = HISTORY_MAX_PAGES,
+) -> Dict[str, Any]:
+    """Aggregate the setlists of ``mbid`` over at most ``max_pages`` pages.
+
+    Args:
+        fetch_page: Coroutine returning the ``/artist/{mbid}/setlists`` document of a page
+        mbid: MusicBrainz id of the artist
+        reporter: Progress and partial results of the current tool call
+        max_pages: Pages fetched at most
+
+    Returns:
+        The ``SetlistAnalytics`` summary, date range and how much of the history was read
+    """
+    analytics = SetlistAnalytics()
+    pages = total = fetched = 0
+    per_page = 20
+    first = last = ""
+    try:
+        for page in range(1, max_pages + 1):
+            document = decode(await fetch_page(mbid, page), Setlists)
+            fetched = page
+            if page == 1:
+                total = document.total
+                per_page = document.items_per_page or per_page
+                pages = min(math.ceil(total / per_page), max_pages)
+            shows = [stats for stats in map(analytics.add, document.setlist) if stats is not None]
+            if document.setlist:
+                first = document.setlist[-1].event_date
+                last = last or document.setlist[0].event_date
+            await reporter.partial({
+                "page": page,
+                "pages": pages,
+                "shows": [
+                    {"id": show.setlist_id, "eventDate": show.event_date, "songs": show.songs, "opener": show.opener, "closer": show.closer}
+                    for show in shows
+                ],
+            })
+            await reporter.progress(page, pages, f"{analytics.shows} shows read")
+            if page >= pages or not document.setlist:
+                break
+    except asyncio.CancelledError:
+        reporter.cancelled(f"{fetched} of {pages} pages")
+        raise
+
+    return {
+        "mbid": mbid,
+        "setlists": total,
+        "pagesRead": fetched,
+        "complete": fetched * per_page >= total,
+        "firstShow": first,
+        "lastShow": last,
+        "summary": analytics.summary(),
+    }
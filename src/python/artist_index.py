@@ -0,0 +1,276 @@
+"""Local artist name -> MBID index for the setlist.fm server.
+
+The agent instructions start nearly every conversation with an artist search
+to find the MBID, usually for a name that was already resolved many times.
+``ArtistIndex`` keeps every artist returned by ``getArtists`` in SQLite:
+
+- normalized names (accents, case, punctuation and a leading "The" removed),
+  sort names (``"Beatles, The"``) and aliases (the query that led to a
+  single result) all point to the artist MBID;
+- each upstream search is recorded with the artists of its first page and
+  its total, under the normalized query and sort order;
+- fuzzy lookup ranks candidates by trigram similarity (Dice coefficient), the
+  trigrams being indexed in SQLite so a lookup stays a couple of queries.
+  Fuzzy candidates are suggestions only: "Blink" is not "Blink-182";
+- ``ArtistIndexMiddleware`` answers ``getArtists``/``searchForArtists`` from
+  the index only when the same normalized search was recorded less than
+  ``ARTIST_INDEX_SEARCH_TTL`` ago, replaying its artists and total, and
+  feeds the index with upstream results otherwise. An exact name hit alone
+  is not enough there: upstream may know other artists by that name.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools.tool import ToolResult
+from opentelemetry import metrics
+
+from serialization import dumps, loads
+from structured_content import text_content
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(os.getenv("SETLISTFM_DATA_DIR", Path.home() / ".cache" / "mcp-azure-apim"))
+ARTIST_INDEX_PATH = Path(os.getenv("ARTIST_INDEX_PATH", DATA_DIR / "artists.db"))
+FUZZY_THRESHOLD = float(os.getenv("ARTIST_INDEX_FUZZY_THRESHOLD", "0.7"))
+SEARCH_TTL = float(os.getenv("ARTIST_INDEX_SEARCH_TTL", 7 * 24 * 3600))
+
+ARTIST_SEARCH_TOOLS = {"getArtists", "searchForArtists"}
+
+meter = metrics.get_meter("artist_index")
+lookups = meter.create_counter("artist_index.lookups", description="Artist searches by index outcome")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    mbid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artist_names (
+    id INTEGER PRIMARY KEY,
+    norm TEXT NOT NULL,
+    mbid TEXT NOT NULL REFERENCES artists(mbid),
+    kind TEXT NOT NULL,
+    trigram_count INTEGER NOT NULL,
+    UNIQUE (norm, mbid)
+);
+CREATE INDEX IF NOT EXISTS artist_names_norm ON artist_names(norm);
+CREATE TABLE IF NOT EXISTS artist_trigrams (
+    trigram TEXT NOT NULL,
+    name_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, name_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS artist_searches (
+    norm TEXT NOT NULL,
+    sort TEXT NOT NULL,
+    mbids TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    items_per_page INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (norm, sort)
+);
+"""
+
+_PUNCTUATION = re.compile(r"[^\w]+")
+
+
+def normalize(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of an artist name."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    words = _PUNCTUATION.sub(" ", stripped.casefold()).split()
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def trigrams(norm: str) -> Set[str]:
+    padded = f"  {norm} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class ArtistMatch:
+    """Outcome of an index lookup.
+
+    ``kind`` is ``"search"`` for a recorded upstream search (``total`` and
+    ``items_per_page`` set), ``"exact"`` for a normalized name or alias,
+    ``"fuzzy"`` for candidates ranked by similarity and ``"miss"``.
+    ``confident`` is set for a recorded search and a single exact artist.
+    """
+
+    artists: List[Dict[str, Any]] = field(default_factory=list)
+    score: float = 0.0
+    confident: bool = False
+    kind: str = "miss"
+    total: Optional[int] = None
+    items_per_page: int = 30
+
+
+class ArtistIndex:
+    """SQLite-backed artist index, safe to share between the loop and worker threads."""
+
+    def __init__(self, path: Path = ARTIST_INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM artists").fetchone()[0]
+
+    def add_artists(self, artists: Iterable[Dict[str, Any]], alias: Optional[str] = None) -> int:
+        """Store setlist.fm artist objects; ``alias`` is recorded for a single artist only."""
+        artists = [artist for artist in artists if artist.get("mbid") and artist.get("name")]
+        now = time.time()
+        with self._lock, self._db:
+            for artist in artists:
+                self._db.execute(
+                    "INSERT INTO artists (mbid, name, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(mbid) DO UPDATE SET name = excluded.name, data = excluded.data, updated_at = excluded.updated_at",
+                    (artist["mbid"], artist["name"], dumps(artist), now),
+                )
+                self._add_name(artist["name"], artist["mbid"], "name")
+                if artist.get("sortName"):
+                    self._add_name(artist["sortName"], artist["mbid"], "sort")
+            if alias and len(artists) == 1:
+                self._add_name(alias, artists[0]["mbid"], "alias")
+        return len(artists)
+
+    def add_search(self, query: str, sort: str, artists: List[Dict[str, Any]], total: int, items_per_page: int = 30) -> None:
+        """Record the first page of an upstream artist search, and store its artists."""
+        self.add_artists(artists, alias=query)
+        norm = normalize(query)
+        mbids = [artist["mbid"] for artist in artists if artist.get("mbid") and artist.get("name")]
+        if not norm or not mbids:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artist_searches (norm, sort, mbids, total, items_per_page, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (norm, sort or "", dumps(mbids), total, items_per_page, time.time()),
+            )
+
+    def _add_name(self, name: str, mbid: str, kind: str) -> None:
+        norm = normalize(name)
+        if not norm:
+            return
+        grams = trigrams(norm)
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO artist_names (norm, mbid, kind, trigram_count) VALUES (?, ?, ?, ?)",
+            (norm, mbid, kind, len(grams)),
+        )
+        if cursor.rowcount:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO artist_trigrams (trigram, name_id) VALUES (?, ?)",
+                [(gram, cursor.lastrowid) for gram in grams],
+            )
+
+    def _artists(self, mbids: Iterable[str]) -> List[Dict[str, Any]]:
+        mbids = list(dict.fromkeys(mbids))
+        placeholders = ",".join("?" * len(mbids))
+        rows = dict(self._db.execute(f"SELECT mbid, data FROM artists WHERE mbid IN ({placeholders})", mbids).fetchall())
+        return [loads(rows[mbid]) for mbid in mbids if mbid in rows]
+
+    def lookup(self, name: str, sort: str = "", limit: int = 10) -> ArtistMatch:
+        """Find artists for ``name``: recorded search, exact normalized match, then trigram similarity."""
+        norm = normalize(name)
+        if not norm:
+            return ArtistMatch()
+        with self._lock:
+            search = self._db.execute(
+                "SELECT mbids, total, items_per_page FROM artist_searches WHERE norm = ? AND sort = ? AND updated_at >= ?",
+                (norm, sort or "", time.time() - SEARCH_TTL),
+            ).fetchone()
+            if search is not None:
+                artists = self._artists(loads(search[0]))
+                if artists:
+                    return ArtistMatch(artists, 1.0, True, "search", search[1], search[2])
+
+            exact = [row[0] for row in self._db.execute("SELECT DISTINCT mbid FROM artist_names WHERE norm = ?", (norm,))]
+            if exact:
+                return ArtistMatch(self._artists(exact), 1.0, len(exact) == 1, "exact")
+
+            grams = trigrams(norm)
+            placeholders = ",".join("?" * len(grams))
+            rows = self._db.execute(
+                "SELECT n.mbid, COUNT(*) AS shared, n.trigram_count FROM artist_trigrams t "
+                "JOIN artist_names n ON n.id = t.name_id "
+                f"WHERE t.trigram IN ({placeholders}) GROUP BY t.name_id",
+                list(grams),
+            ).fetchall()
+            best: Dict[str, float] = {}
+            for mbid, shared, count in rows:
+                score = 2 * shared / (len(grams) + count)
+                best[mbid] = max(best.get(mbid, 0.0), score)
+            ranked = [item for item in sorted(best.items(), key=lambda item: item[1], reverse=True) if item[1] >= FUZZY_THRESHOLD]
+            if not ranked:
+                return ArtistMatch()
+            return ArtistMatch(self._artists(mbid for mbid, _ in ranked[:limit]), ranked[0][1], False, "fuzzy")
+
+
+class ArtistIndexMiddleware(Middleware):
+    """Replay recorded artist searches from the index, record the others."""
+
+    def __init__(self, index: Optional[ArtistIndex] = None, tools: Iterable[str] = ARTIST_SEARCH_TOOLS):
+        self.index = index if index is not None else ArtistIndex()
+        self.tools = set(tools)
+
+    @staticmethod
+    def _indexable(arguments: Dict[str, Any]) -> bool:
+        # Only plain first-page name searches; other filters need the upstream API.
+        if not arguments.get("artistName") or not set(arguments) <= {"artistName", "p", "sort"}:
+            return False
+        try:
+            return int(arguments.get("p") or 1) == 1
+        except (TypeError, ValueError):
+            return False
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = getattr(context.message, "name", "")
+        arguments = getattr(context.message, "arguments", None) or {}
+        if tool not in self.tools or not self._indexable(arguments):
+            return await call_next(context)
+
+        name = str(arguments["artistName"])
+        sort = str(arguments.get("sort") or "")
+        match = await asyncio.to_thread(self.index.lookup, name, sort)
+        lookups.add(1, {"outcome": f"{match.kind}.{'hit' if match.kind == 'search' else 'miss'}"})
+        if match.kind == "search":
+            logger.info("Resolved artist search %r from the index (%d artists)", name, len(match.artists))
+            structured = {
+                "type": "artists",
+                "itemsPerPage": match.items_per_page,
+                "page": 1,
+                "total": match.total,
+                "artist": match.artists,
+            }
+            return ToolResult(content=text_content(structured), structured_content=structured)
+
+        result = await call_next(context)
+        document = getattr(result, "structured_content", None) or {}
+        found = document.get("artist")
+        if isinstance(found, list) and found:
+            total = int(document.get("total") or len(found))
+            items_per_page = int(document.get("itemsPerPage") or 30)
+            await asyncio.to_thread(self.index.add_search, name, sort, found, total, items_per_page)
+        return result
@@ -0,0 +1,276 @@
+"""Micro-benchmarks for the setlist.fm payload handling.
+
+Run with: cd src/python && python benchmarks.py [benchmark ...]
+
+Payloads are synthesized with the shape and size of real setlist.fm pages
+(20 setlists per page, ~20 songs per show) so no API key is needed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import httpx
+from fastmcp import Client, FastMCP
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from setlist_analytics import SetlistAnalytics
+from serialization import get_backend
+from setlistfm_models import Setlists, decode
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from static_responses import StaticResponse
+from structured_content import SWAGGER_PATH, apply_output_schema
+from tool_cache import ToolListCache
+
+SONG_POOL = [f"Song Title Number {i}" for i in range(120)]
+VENUE_POOL = [(f"Venue {i}", f"City {i % 40}") for i in range(150)]
+
+
+def sample_setlists_payload(pages: int = 1, per_page: int = 20, seed: int = 42) -> bytes:
+    """Build a setlist.fm ``/search/setlists`` payload merging ``pages`` pages."""
+    rng = random.Random(seed)
+    setlists = []
+    for index in range(pages * per_page):
+        venue, city = rng.choice(VENUE_POOL)
+        sets = [{"song": [{"name": name} for name in rng.sample(SONG_POOL, rng.randint(12, 22))]}]
+        if rng.random() < 0.8:
+            sets.append({"encore": 1, "song": [{"name": name} for name in rng.sample(SONG_POOL, rng.randint(1, 4))]})
+        setlists.append(
+            {
+                "id": f"{index:08x}",
+                "versionId": f"7{index:07x}",
+                "eventDate": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-20{rng.randint(10, 25)}",
+                "lastUpdated": "2025-01-01T10:00:00.000+0000",
+                "artist": {
+                    "mbid": "b10bbbfc-cf9e-42e0-be17-e2c3e1d2600d",
+                    "name": "Wolf Alice",
+                    "sortName": "Wolf Alice",
+                    "url": "https://www.setlist.fm/setlists/wolf-alice-23d6a88b.html",
+                },
+                "venue": {
+                    "id": f"{rng.randint(0, 1 << 31):08x}",
+                    "name": venue,
+                    "url": "https://www.setlist.fm/venue/venue.html",
+                    "city": {
+                        "id": "5357527",
+                        "name": city,
+                        "state": "California",
+                        "stateCode": "CA",
+                        "coords": {"lat": 34.1, "long": -118.3},
+                        "country": {"code": "US", "name": "United States"},
+                    },
+                },
+                "tour": {"name": "The Clearing Tour"},
+                "sets": {"set": sets},
+                "url": f"https://www.setlist.fm/setlist/wolf-alice/{index}.html",
+            }
+        )
+    payload = {"type": "setlists", "itemsPerPage": per_page, "page": 1, "total": len(setlists), "setlist": setlists}
+    return json.dumps(payload).encode("utf-8")
+
+
+def timeit(func: Callable[[], Any], repeat: int = 5, number: int = 20) -> float:
+    """Return the best mean duration of ``func`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1000
+
+
+def retained_kib(func: Callable[[], Any]) -> float:
+    """Return the memory still held by the object ``func`` returns, in KiB."""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained / 1024
+
+
+def _song_names_from_dicts(raw: bytes) -> list[str]:
+    """The historical render.py path: json.loads then .get() chains and str().strip()."""
+    names = []
+    for setlist in json.loads(raw).get("setlist") or []:
+        for raw_set in setlist.get("sets", {}).get("set") or []:
+            for song in raw_set.get("song") or []:
+                name = str(song.get("name", "")).strip()
+                if name:
+                    names.append(name)
+        str(setlist.get("venue", {}).get("name") or "").strip()
+        str(setlist.get("venue", {}).get("city", {}).get("name") or "").strip()
+    return names
+
+
+def _song_names_from_models(raw: bytes) -> list[str]:
+    names = []
+    for setlist in decode(raw, Setlists).setlist:
+        for song_set in setlist.set:
+            names.extend(song.name for song in song_set.song if song.name)
+    return names
+
+
+def bench_models() -> None:
+    """Typed models vs. raw dict walking on one page and on a 10-page merge."""
+    for pages in (1, 10):
+        raw = sample_setlists_payload(pages=pages)
+        assert _song_names_from_dicts(raw) == _song_names_from_models(raw)
+        dict_ms = timeit(lambda: _song_names_from_dicts(raw))
+        model_ms = timeit(lambda: _song_names_from_models(raw))
+        dict_kib = retained_kib(lambda: json.loads(raw))
+        model_kib = retained_kib(lambda: decode(raw, Setlists))
+        print(
+            f"models  pages={pages:<3} size={len(raw) / 1024:7.1f} KiB  "
+            f"dicts={dict_ms:7.3f} ms / {dict_kib:7.1f} KiB  "
+            f"models={model_ms:7.3f} ms / {model_kib:7.1f} KiB"
+        )
+
+
+def bench_analytics() -> None:
+    """Single-pass aggregates over thousands of decoded shows."""
+    for pages in (10, 200):
+        setlists = decode(sample_setlists_payload(pages=pages), Setlists).setlist
+        elapsed_ms = timeit(lambda: SetlistAnalytics().add_all(setlists), repeat=3, number=3)
+        counters_kib = retained_kib(lambda: SetlistAnalytics().add_all(setlists))
+        print(
+            f"analytics shows={len(setlists):<5} {elapsed_ms:8.2f} ms  "
+            f"{len(setlists) / elapsed_ms * 1000:10.0f} shows/s  counters {counters_kib:6.1f} KiB"
+        )
+
+
+async def _requests_per_second(app: Any, path: str, headers: list, count: int = 20000) -> float:
+    """Drive ``app`` directly through ASGI so only the server-side cost is measured."""
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+             "scheme": "http", "query_string": b"", "headers": headers, "server": ("bench", 80), "client": ("bench", 1)}
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return count / (time.perf_counter() - start)
+
+
+def _openapi_server() -> FastMCP:
+    spec = json.loads(SWAGGER_PATH.read_text(encoding="utf-8"))
+    return FastMCP.from_openapi(
+        openapi_spec=spec, client=httpx.AsyncClient(base_url="https://api.setlist.fm/rest"), mcp_component_fn=apply_output_schema
+    )
+
+
+def bench_static() -> None:
+    """Throughput of /health, rebuilt per request vs. pre-serialized."""
+    document = {"status": "healthy", "service": "mcp-server"}
+    static = StaticResponse.json(document)
+
+    async def dynamic(_request):
+        return JSONResponse(document)
+
+    app = Starlette(routes=[Route("/dynamic", dynamic), Route("/static", static)])
+
+    async def http_rates() -> tuple[float, float, float]:
+        return (
+            await _requests_per_second(app, "/dynamic", []),
+            await _requests_per_second(app, "/static", []),
+            await _requests_per_second(app, "/static", [(b"if-none-match", static.etag.encode())]),
+        )
+
+    dynamic_rps, static_rps, not_modified_rps = asyncio.run(http_rates())
+    print(f"health  dynamic={dynamic_rps:8.0f} req/s  static={static_rps:8.0f} req/s  304={not_modified_rps:8.0f} req/s")
+
+
+async def _tool_list_requests(server: FastMCP, cache: ToolListCache) -> int:
+    """``tools/list`` requests received by ``server`` during one session listing and calling a tool."""
+    calls = 0
+
+    class CountListTools(Middleware):
+        async def on_list_tools(self, context: MiddlewareContext, call_next):
+            nonlocal calls
+            calls += 1
+            return await call_next(context)
+
+    server.add_middleware(CountListTools())
+    try:
+        async with Client(server, message_handler=cache) as client:
+            await cache.list_tools(client, "memory")
+            await client.call_tool("ping", {})
+    finally:
+        server.middleware.remove(server.middleware[-1])
+    return calls
+
+
+def bench_tool_cache() -> None:
+    """tools/list requests and time of a session with a cold vs. warm tool listing cache."""
+    server = _openapi_server()
+
+    @server.tool
+    def ping() -> dict:
+        return {"ok": True}
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ToolListCache(Path(directory) / "tools.json")
+        for state in ("cold", "warm"):
+            start = time.perf_counter()
+            requests = asyncio.run(_tool_list_requests(server, cache))
+            print(f"toolcache  {state}  tools/list requests={requests}  session={(time.perf_counter() - start) * 1000:7.1f} ms")
+        assert requests == 0, "a warm session must not send tools/list"
+
+
+def bench_json() -> None:
+    """loads/dumps of setlist.fm pages with each installed JSON backend."""
+    payloads = {pages: sample_setlists_payload(pages) for pages in (1, 10, 50)}
+    parsed = {pages: json.loads(raw) for pages, raw in payloads.items()}
+    baseline: dict[tuple[str, int], float] = {}
+    for name in ("json", "orjson", "msgspec"):
+        backend = get_backend(name)
+        if backend.name != name:
+            print(f"json  {name:<8} not installed")
+            continue
+        for pages, raw in payloads.items():
+            loads_ms = timeit(lambda: backend.loads(raw), number=5)
+            dumps_ms = timeit(lambda: backend.dumpb(parsed[pages], default=str), number=5)
+            baseline.setdefault(("loads", pages), loads_ms)
+            baseline.setdefault(("dumps", pages), dumps_ms)
+            print(
+                f"json  {name:<8} pages={pages:<3} ({len(raw) / 1024:7.0f} KiB)  "
+                f"loads={loads_ms:7.2f} ms ({baseline['loads', pages] / loads_ms:4.1f}x)  "
+                f"dumps={dumps_ms:7.2f} ms ({baseline['dumps', pages] / dumps_ms:4.1f}x)"
+            )
+
+
+BENCHMARKS: dict[str, Callable[[], None]] = {
+    "models": bench_models,
+    "analytics": bench_analytics,
+    "static": bench_static,
+    "toolcache": bench_tool_cache,
+    "json": bench_json,
+}
+
+
+def main(names: list[str]) -> None:
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Use one of: {', '.join(BENCHMARKS)}.")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,263 @@
+"""Warm the upstream response cache before a new replica reports ready.
+
+A replica started by a deploy or a scale-out has an empty ``ResponseCache``
+(``upstream_cache.py``) and its first users pay the setlist.fm latency.
+``CacheWarmer`` replays the most popular tool calls before ``/ready`` passes:
+
+- the popularity list is a JSONL file (``WARMUP_LOG``), one tool call per
+  line. ``ToolCallLogMiddleware`` writes it when ``TOOL_CALL_LOG`` is set,
+  rotating it to ``<file>.1`` past ``TOOL_CALL_LOG_MAX_BYTES``; both files are
+  read, and calls whose ``ts`` is older than ``WARMUP_WINDOW`` seconds are
+  ignored. Exported OpenTelemetry spans (``gen_ai.tool.name`` and
+  ``gen_ai.tool.call.arguments`` attributes) or pre-aggregated lines with a
+  ``count`` are read as well;
+- the ``WARMUP_TOP_N`` most frequent calls are sent as the HTTP requests the
+  generated tools would make, found from the OpenAPI spec, through the server's
+  own client so the responses land in its cache. Artist searches also prefetch
+  the first page of recent setlists of the artist found;
+- requests are spaced to ``WARMUP_RATE`` per second (which must be positive
+  when ``WARMUP_LOG`` is set) and also draw from the rate limit the server's
+  client shares with the tools and the mirror sync (``rate_limit.py``);
+  ``WARMUP_RATE`` below that limit leaves room for live traffic. The whole
+  stage stops after ``WARMUP_BUDGET`` seconds or at the first ``429``. The
+  replica becomes ready when the stage ends, whatever its outcome.
+
+Point the readiness probe of the deployment at ``/ready`` so traffic waits
+for the warm-up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from opentelemetry import metrics
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LOG = os.getenv("WARMUP_LOG")
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+WARMUP_BUDGET = float(os.getenv("WARMUP_BUDGET", "60"))
+# Share of the upstream rate limit (rate_limit.py) taken by the warm-up.
+WARMUP_RATE = float(os.getenv("WARMUP_RATE", "1"))
+# Only tool calls of the last WARMUP_WINDOW seconds count towards popularity.
+WARMUP_WINDOW = float(os.getenv("WARMUP_WINDOW", 7 * 24 * 3600))
+TOOL_CALL_LOG = os.getenv("TOOL_CALL_LOG")
+TOOL_CALL_LOG_MAX_BYTES = int(os.getenv("TOOL_CALL_LOG_MAX_BYTES", 10 * 1024 * 1024))
+
+# Tool names of the APIM-hosted MCP server -> names of the generated tools.
+TOOL_ALIASES = {"searchForArtists": "getArtists", "searchForSetlists": "getSetlists"}
+
+meter = metrics.get_meter("cache_warmer")
+prefetched = meter.create_counter("cache_warmer.prefetched", description="Upstream responses prefetched at startup, by outcome")
+
+Call = Tuple[str, Dict[str, Any]]
+
+
+def rotated(path: Path) -> Path:
+    """The previous generation of a rotated log file."""
+    return path.with_name(f"{path.name}.1")
+
+
+def _parse_record(record: Dict[str, Any], since: float) -> Optional[Tuple[str, Dict[str, Any], int]]:
+    if isinstance(record.get("ts"), (int, float)) and record["ts"] < since:
+        return None
+    attributes = record.get("attributes") or {}
+    tool = record.get("tool") or record.get("name") or attributes.get("gen_ai.tool.name")
+    arguments = record.get("arguments", attributes.get("gen_ai.tool.call.arguments"))
+    if isinstance(arguments, str):
+        arguments = loads(arguments)
+    if not tool or not isinstance(arguments, dict):
+        return None
+    return TOOL_ALIASES.get(tool, tool), arguments, int(record.get("count") or 1)
+
+
+def popular_calls(path: Path, top_n: int = WARMUP_TOP_N, window: float = WARMUP_WINDOW) -> List[Call]:
+    """The ``top_n`` most frequent tool calls of the last ``window`` seconds in the JSONL file at ``path``.
+
+    The rotated ``<path>.1`` is read too; records without a ``ts`` always count.
+    """
+    counts: Counter = Counter()
+    since = time.time() - window
+    for log_path in (rotated(path), path):
+        if not log_path.exists():
+            continue
+        with open(log_path, "rb") as log:
+            for number, line in enumerate(log, 1):
+                if not line.strip():
+                    continue
+                try:
+                    parsed = _parse_record(loads(line), since)
+                except (ValueError, TypeError):
+                    logger.debug("Skipping unreadable line %d of %s", number, log_path)
+                    continue
+                if parsed is not None:
+                    tool, arguments, count = parsed
+                    counts[(tool, dumps(arguments, sort_keys=True))] += count
+    return [(tool, loads(arguments)) for (tool, arguments), _ in counts.most_common(top_n)]
+
+
+def tool_routes(openapi_spec: Dict[str, Any], mcp_names: Dict[str, str]) -> Dict[str, str]:
+    """Tool name -> path template of its ``GET`` operation, e.g. ``/1.0/artist/{mbid}``."""
+    routes = {}
+    for path, operations in openapi_spec.get("paths", {}).items():
+        operation_id = (operations.get("get") or {}).get("operationId")
+        if operation_id:
+            routes[mcp_names.get(operation_id, operation_id)] = path
+    return routes
+
+
+class CacheWarmer:
+    """Prefetch popular upstream requests at startup and gate readiness on it."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        routes: Dict[str, str],
+        log_path: Optional[str] = WARMUP_LOG,
+        top_n: int = WARMUP_TOP_N,
+        budget: float = WARMUP_BUDGET,
+        rate: float = WARMUP_RATE,
+    ):
+        """
+        Args:
+            client: The server's setlist.fm client, whose transport holds the response cache
+            routes: Tool name -> path template, see ``tool_routes``
+            log_path: JSONL popularity list, warm-up skipped when unset or missing
+            top_n: Number of popular calls replayed
+            budget: Seconds the whole stage may take
+            rate: Upstream requests per second, must be positive when ``log_path`` is set
+        """
+        self.client = client
+        self.routes = routes
+        self.log_path = Path(log_path) if log_path else None
+        # Only a warm-up that may run needs a rate: an unset WARMUP_LOG disables it whatever WARMUP_RATE.
+        if self.log_path is not None and rate <= 0:
+            raise ValueError(f"WARMUP_RATE must be positive when WARMUP_LOG is set, got {rate}")
+        self.top_n = top_n
+        self.budget = budget
+        self.rate = rate
+        self.ready = asyncio.Event()
+        self.stats: Dict[str, Any] = {"state": "pending"}
+        self._task: Optional[asyncio.Task] = None
+
+    def request_for(self, tool: str, arguments: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Path and query parameters the generated ``tool`` sends for ``arguments``."""
+        template = self.routes.get(tool)
+        if template is None:
+            return None
+        params = {key: value for key, value in arguments.items() if value is not None}
+        path = template
+        while "{" in path:
+            name = path[path.index("{") + 1 : path.index("}")]
+            if name not in params:
+                return None
+            path = path.replace(f"{{{name}}}", str(params.pop(name)))
+        return path, params
+
+    async def warm(self, calls: Iterable[Call]) -> Dict[str, Any]:
+        """Replay ``calls`` within the budget; returns counts by outcome."""
+        outcomes: Counter = Counter()
+        deadline = time.monotonic() + self.budget
+        queue = deque(calls)
+        while queue:
+            tool, arguments = queue.popleft()
+            request = self.request_for(tool, arguments)
+            if request is None:
+                outcomes["skipped"] += 1
+                continue
+            left = deadline - time.monotonic()
+            if left <= 0:
+                outcomes["out_of_budget"] += len(queue) + 1
+                break
+            path, params = request
+            try:
+                response = await asyncio.wait_for(self.client.get(path, params=params), left)
+            except (asyncio.TimeoutError, httpx.HTTPError) as exc:
+                logger.info("Warm-up of %s %s failed: %s", tool, path, exc)
+                outcomes["error"] += 1
+                continue
+            outcome = "ok" if response.status_code == 200 else str(response.status_code)
+            outcomes[outcome] += 1
+            prefetched.add(1, {"outcome": outcome})
+            if response.status_code == 429:
+                logger.warning("setlist.fm rate limit reached, stopping the warm-up")
+                break
+            if tool == "getArtists" and response.status_code == 200:
+                # Recent setlists of the artist found, the usual next call.
+                artists = loads(response.content).get("artist") or []
+                if artists and artists[0].get("mbid"):
+                    queue.appendleft(("getArtistSetlists", {"mbid": artists[0]["mbid"], "p": 1}))
+            await asyncio.sleep(1 / self.rate)
+        return dict(outcomes)
+
+    async def run(self) -> None:
+        start = time.perf_counter()
+        self.stats = {"state": "warming"}
+        try:
+            if self.log_path is None or not (self.log_path.exists() or rotated(self.log_path).exists()):
+                self.stats = {"state": "skipped", "reason": "no popularity list"}
+                return
+            calls = await asyncio.to_thread(popular_calls, self.log_path, self.top_n)
+            outcomes = await self.warm(calls)
+            self.stats = {"state": "done", "calls": len(calls), "outcomes": outcomes}
+        except Exception as exc:
+            logger.exception("Cache warm-up failed")
+            self.stats = {"state": "failed", "error": str(exc)}
+        finally:
+            self.stats["seconds"] = round(time.perf_counter() - start, 1)
+            logger.info("Cache warm-up %s", self.stats)
+            self.ready.set()
+
+    @asynccontextmanager
+    async def lifespan(self, _server: Any) -> AsyncIterator[None]:
+        """FastMCP lifespan running the warm-up in the background; ``/ready`` waits for it."""
+        self._task = asyncio.create_task(self.run(), name="cache-warm-up")
+        try:
+            yield
+        finally:
+            self._task.cancel()
+            self._task = None
+
+    async def ready_endpoint(self, _request: Request) -> JSONResponse:
+        """Readiness probe: ``503`` until the warm-up stage has ended."""
+        return JSONResponse(self.stats, status_code=200 if self.ready.is_set() else 503)
+
+
+class ToolCallLogMiddleware(Middleware):
+    """Append every tool call to ``TOOL_CALL_LOG`` (JSONL), the popularity list of the next replicas."""
+
+    def __init__(self, path: Optional[str] = TOOL_CALL_LOG, max_bytes: int = TOOL_CALL_LOG_MAX_BYTES):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+
+    def _append(self, line: str) -> None:
+        try:
+            if self.path.stat().st_size >= self.max_bytes:
+                # One previous generation is kept, popular_calls reads both.
+                os.replace(self.path, rotated(self.path))
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as log:
+            log.write(line)
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        if self.path is not None:
+            record = {"ts": time.time(), "tool": getattr(context.message, "name", ""), "arguments": getattr(context.message, "arguments", None) or {}}
+            try:
+                await asyncio.to_thread(self._append, dumps(record, default=str) + "\n")
+            except OSError as exc:
+                logger.warning("Cannot append to %s: %s", self.path, exc)
+        return await call_next(context)
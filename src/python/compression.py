@@ -0,0 +1,355 @@
+"""Negotiated response compression for the HTTP endpoint of the MCP server.
+
+Tool results carrying setlist pages are large, repetitive JSON and were sent
+uncompressed to APIM and the clients. ``CompressionMiddleware`` compresses
+the responses of the Starlette app with the best encoding the client accepts:
+
+- ``zstd`` (``zstandard`` package) and ``br`` (``brotli`` package) are used
+  when installed, ``gzip`` (stdlib) always is; ``COMPRESSION_ENCODINGS`` sets
+  the server's order of preference, ``Accept-Encoding`` q-values come first;
+- complete bodies smaller than ``COMPRESSION_MIN_SIZE`` are sent as they are,
+  and so is a body that would not shrink. Bodies from ``COMPRESSION_OFFLOAD_SIZE``
+  up are compressed in a worker thread rather than on the event loop;
+- streamed responses, the MCP SSE streams included, go through one compressor
+  per response flushed after every chunk: each event reaches the client as
+  soon as it is sent, and later events reuse the context of the earlier ones.
+  ``COMPRESSION_SSE=false`` leaves SSE streams alone for proxies that buffer
+  compressed streams;
+- responses already encoded or of a binary media type are left untouched; a
+  compressed response gets ``Vary: Accept-Encoding`` and a weak ETag.
+  ``Cache-Control: no-transform``, set by the MCP SDK on its SSE streams, binds
+  intermediaries only and is kept as is: the middleware is part of the origin.
+
+``http.compression.bytes_in``, ``http.compression.bytes_saved`` and
+``http.compression.cpu_time`` are counted per route template of the app (or
+``other``) and encoding, to weigh the bandwidth saved against the CPU spent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from opentelemetry import metrics
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION = os.getenv("COMPRESSION", "true").lower() == "true"
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()]
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", 64 * 1024))
+COMPRESSION_SSE = os.getenv("COMPRESSION_SSE", "true").lower() == "true"
+
+ASGIApp = Callable[[dict, Callable, Callable], Awaitable[None]]
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+meter = metrics.get_meter("compression")
+bytes_in = meter.create_counter("http.compression.bytes_in", unit="By", description="Response bytes before compression")
+# Negative when flushed chunks of a stream come out larger than they went in.
+bytes_saved = meter.create_up_down_counter(
+    "http.compression.bytes_saved", unit="By", description="Response bytes saved by compression"
+)
+cpu_time = meter.create_counter(
+    "http.compression.cpu_time", unit="ms", description="CPU time spent compressing responses"
+)
+
+
+class _StreamCompressor(ABC):
+    """Compressor of one streamed response; ``compress`` output decodes on its own."""
+
+    @abstractmethod
+    def compress(self, chunk: bytes) -> bytes: ...
+
+    @abstractmethod
+    def finish(self) -> bytes: ...
+
+
+class _Codec(ABC):
+    """One ``Content-Encoding``; ``compress`` may run in several threads at once."""
+
+    name = "identity"
+
+    def compress(self, data: bytes) -> bytes:
+        stream = self.stream()
+        return stream.compress(data) + stream.finish()
+
+    @abstractmethod
+    def stream(self) -> _StreamCompressor: ...
+
+
+class _GzipStream(_StreamCompressor):
+    def __init__(self, level: int):
+        # wbits 31: gzip header and trailer around the deflate stream.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _GzipCodec(_Codec):
+    name = "gzip"
+    level = 6
+
+    def stream(self) -> _StreamCompressor:
+        return _GzipStream(self.level)
+
+
+class _BrotliStream(_StreamCompressor):
+    def __init__(self, brotli, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _BrotliCodec(_Codec):
+    name = "br"
+    # Qualities above 5 cost much more CPU for little gain on dynamic responses.
+    quality = 5
+
+    def __init__(self):
+        import brotli
+
+        self._brotli = brotli
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.compress(data, quality=self.quality)
+
+    def stream(self) -> _StreamCompressor:
+        return _BrotliStream(self._brotli, self.quality)
+
+
+class _ZstdStream(_StreamCompressor):
+    def __init__(self, zstandard, compressor):
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = compressor.compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _ZstdCodec(_Codec):
+    name = "zstd"
+    level = 3
+
+    def __init__(self):
+        import zstandard
+
+        self._zstandard = zstandard
+        # A compressor object runs one operation at a time: one per thread for
+        # whole bodies (offloaded ones run in worker threads), one per stream.
+        self._local = threading.local()
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = self._zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def stream(self) -> _StreamCompressor:
+        return _ZstdStream(self._zstandard, self._zstandard.ZstdCompressor(level=self.level))
+
+
+_CODECS: Dict[str, Callable[[], _Codec]] = {
+    "zstd": _ZstdCodec,
+    "br": _BrotliCodec,
+    "gzip": _GzipCodec,
+}
+
+
+def available_codecs(names: List[str] = COMPRESSION_ENCODINGS) -> Dict[str, _Codec]:
+    """Installed codecs among ``names``, in the same order of preference."""
+    codecs = {}
+    for name in names:
+        factory = _CODECS.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown encoding '{name}'. Use some of: {', '.join(_CODECS)}.")
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            logger.info("Encoding %s is not installed, skipping it", name)
+    return codecs
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """The encoding of ``encodings`` (by preference) the ``Accept-Encoding`` value ranks highest, if any."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+    ranked = [(weights.get(name, weights.get("*", 0.0)), -position, name) for position, name in enumerate(encodings)]
+    best = max(ranked, default=None)
+    return best[2] if best is not None and best[0] > 0 else None
+
+
+def route_template(scope: dict) -> str:
+    """Path template of the app route matching ``scope``, ``other`` when none does."""
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "") or "other"
+    return "other"
+
+
+def _timed(function: Callable[[bytes], bytes], data: bytes) -> Tuple[bytes, float]:
+    # thread_time counts the thread doing the work, the worker thread when offloaded.
+    start = time.thread_time()
+    result = function(data)
+    return result, (time.thread_time() - start) * 1000
+
+
+class CompressionMiddleware:
+    """Compress responses with the encoding negotiated from ``Accept-Encoding``."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: List[str] = COMPRESSION_ENCODINGS,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        offload_size: int = COMPRESSION_OFFLOAD_SIZE,
+        compress_sse: bool = COMPRESSION_SSE,
+        enabled: bool = COMPRESSION,
+    ):
+        """
+        Args:
+            app: The ASGI application
+            encodings: Accepted encodings by order of preference, the uninstalled ones are skipped
+            minimum_size: Complete bodies below this size (bytes) are not compressed
+            offload_size: Chunks from this size (bytes) up are compressed in a worker thread
+            compress_sse: Whether ``text/event-stream`` responses are compressed
+            enabled: ``False`` passes every response through
+        """
+        self.app = app
+        self.codecs = available_codecs(encodings) if enabled else {}
+        self.encodings = list(self.codecs)
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.compress_sse = compress_sse
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressedResponse(self, scope, self.codecs[encoding], send))
+
+
+class _CompressedResponse:
+    """ASGI ``send`` wrapper compressing one response."""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: dict, codec: _Codec, send: Callable):
+        self.middleware = middleware
+        self.codec = codec
+        self.send = send
+        # A template, not the raw path: metric attribute values must stay bounded.
+        self.route = route_template(scope)
+        self.start: Optional[dict] = None
+        self.stream: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: dict) -> None:
+        if self.passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+            await self.send(message)
+        elif message["type"] == "http.response.start":
+            # Held back until the first body chunk tells whether to compress.
+            self.start = message
+        elif self.stream is not None:
+            await self._send_chunk(message)
+        else:
+            await self._first_body(message)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").lower()
+        if media_type.startswith("text/event-stream"):
+            return self.middleware.compress_sse
+        return media_type.startswith(_COMPRESSIBLE_TYPES) or "+json" in media_type
+
+    async def _first_body(self, message: dict) -> None:
+        self.start["headers"] = list(self.start.get("headers", []))
+        headers = MutableHeaders(raw=self.start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self._compressible(headers) or (not more_body and len(body) < self.middleware.minimum_size):
+            await self._pass(message)
+            return
+
+        if not more_body:
+            compressed = await self._compress(self.codec.compress, body)
+            if len(compressed) >= len(body):
+                await self._pass(message)
+                return
+            self._set_headers(headers)
+            headers["content-length"] = str(len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        self.stream = self.codec.stream()
+        self._set_headers(headers)
+        del headers["content-length"]
+        await self.send(self.start)
+        await self._send_chunk(message)
+
+    async def _send_chunk(self, message: dict) -> None:
+        more_body = message.get("more_body", False)
+        body = message.get("body", b"")
+        data = await self._compress(self.stream.compress, body) if body else b""
+        if not more_body:
+            data += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _pass(self, message: dict) -> None:
+        self.passthrough = True
+        await self.send(self.start)
+        await self.send(message)
+
+    def _set_headers(self, headers: MutableHeaders) -> None:
+        headers["content-encoding"] = self.codec.name
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes differ from the ones the strong ETag named.
+            headers["etag"] = f"W/{etag}"
+
+    async def _compress(self, function: Callable[[bytes], bytes], data: bytes) -> bytes:
+        if len(data) >= self.middleware.offload_size:
+            compressed, cpu_ms = await asyncio.to_thread(_timed, function, data)
+        else:
+            compressed, cpu_ms = _timed(function, data)
+        attributes = {"http.route": self.route, "http.response.content_encoding": self.codec.name}
+        bytes_in.add(len(data), attributes)
+        bytes_saved.add(len(data) - len(compressed), attributes)
+        cpu_time.add(cpu_ms, attributes)
+        return compressed
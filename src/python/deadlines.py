@@ -0,0 +1,144 @@
+"""Request deadlines propagated from the MCP clients to the upstream HTTP calls.
+
+A caller that gives up after N seconds should not leave the server querying
+setlist.fm on its behalf. The caller sends its remaining budget in
+milliseconds, relative like gRPC's ``grpc-timeout`` so client and server
+clocks do not need to agree:
+
+- ``_meta.deadlineMs`` on MCP requests (``deadline_meta``), or
+- the ``X-Deadline-Ms`` HTTP header (plain HTTP gateways, ``deadline_headers``).
+
+On the server, ``DeadlineMiddleware`` turns it into an absolute deadline in a
+context variable, fails fast when it has already passed, and stops the tool
+with a timeout error when it runs out. ``DeadlineTransport`` caps the httpx
+timeouts of upstream requests to the remaining budget and cancels them at the
+deadline. Upstream calls cancelled or completed after the caller gave up are
+counted in ``deadline.wasted_upstream_calls``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_META_KEY = "deadlineMs"
+DEADLINE_HEADER = "x-deadline-ms"
+# Budget applied when the caller sends none; 0 disables it.
+DEFAULT_DEADLINE_MS = float(os.getenv("DEFAULT_DEADLINE_MS", "0"))
+
+meter = metrics.get_meter("deadlines")
+deadline_exceeded = meter.create_counter(
+    "deadline.exceeded", description="Tool calls stopped because the caller's deadline passed"
+)
+wasted_upstream_calls = meter.create_counter(
+    "deadline.wasted_upstream_calls", description="Upstream calls cancelled or completed after the caller's deadline"
+)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, ``None`` without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_meta(timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+    """``_meta`` carrying a ``timeout`` (seconds) budget, for ``Client.call_tool(meta=...)``."""
+    return None if timeout is None else {DEADLINE_META_KEY: int(timeout * 1000)}
+
+
+def deadline_headers(timeout: Optional[float]) -> Dict[str, str]:
+    """HTTP headers carrying a ``timeout`` (seconds) budget."""
+    return {} if timeout is None else {DEADLINE_HEADER: str(int(timeout * 1000))}
+
+
+def _budget_ms(context: MiddlewareContext) -> Optional[float]:
+    request_context = getattr(context.fastmcp_context, "request_context", None) if context.fastmcp_context else None
+    meta = getattr(request_context, "meta", None)
+    value = getattr(meta, DEADLINE_META_KEY, None) if meta is not None else None
+    if value is None:
+        value = get_http_headers(include_all=True).get(DEADLINE_HEADER)
+    try:
+        return float(value) if value is not None else (DEFAULT_DEADLINE_MS or None)
+    except (TypeError, ValueError):
+        logger.warning("Ignoring malformed deadline %r", value)
+        return DEFAULT_DEADLINE_MS or None
+
+
+class DeadlineMiddleware(Middleware):
+    """Enforce the caller's deadline on tool calls."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        budget_ms = _budget_ms(context)
+        if budget_ms is None:
+            return await call_next(context)
+        tool = getattr(context.message, "name", "?")
+        attributes = {"mcp.tool.name": tool}
+        if budget_ms <= 0:
+            deadline_exceeded.add(1, attributes)
+            raise ToolError(f"Deadline already exceeded before {tool} started")
+
+        token = _deadline.set(time.monotonic() + budget_ms / 1000)
+        try:
+            return await asyncio.wait_for(call_next(context), budget_ms / 1000)
+        except asyncio.TimeoutError:
+            deadline_exceeded.add(1, attributes)
+            raise ToolError(f"Deadline of {budget_ms:.0f} ms exceeded while running {tool}") from None
+        finally:
+            _deadline.reset(token)
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """httpx transport bounding each request by the current deadline."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        left = remaining()
+        if left is None:
+            return await self._transport.handle_async_request(request)
+        attributes = {"http.host": request.url.host}
+        if left <= 0:
+            raise httpx.TimeoutException("Request deadline exceeded before sending", request=request)
+
+        # Never wait on connect/read/write/pool longer than the caller will.
+        timeouts = request.extensions.get("timeout", {})
+        request.extensions["timeout"] = {
+            key: left if timeouts.get(key) is None else min(timeouts[key], left)
+            for key in ("connect", "read", "write", "pool")
+        }
+        try:
+            response = await asyncio.wait_for(self._transport.handle_async_request(request), left)
+        except asyncio.TimeoutError:
+            wasted_upstream_calls.add(1, attributes)
+            raise httpx.TimeoutException("Request deadline exceeded", request=request) from None
+        except (httpx.TimeoutException, asyncio.CancelledError):
+            # Cancelled by DeadlineMiddleware, or an httpx timeout capped to the budget.
+            if self._expired():
+                wasted_upstream_calls.add(1, attributes)
+            raise
+        if self._expired():
+            wasted_upstream_calls.add(1, attributes)
+        return response
+
+    @staticmethod
+    def _expired() -> bool:
+        left = remaining()
+        return left is not None and left <= 0
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
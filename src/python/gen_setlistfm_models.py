@@ -0,0 +1,300 @@
+"""Generate ``setlistfm_models.py`` from the setlist.fm swagger definitions.
+
+Run with: cd src/python && python gen_setlistfm_models.py
+
+Every ``json_*`` definition of ``src/apim/setlistfm/swagger.json`` becomes a
+model class. With ``msgspec`` installed the models are ``msgspec.Struct``
+types, renamed to the JSON keys, that ``decode`` fills straight from the
+response bytes in one pass; otherwise they are slot-based dataclasses. Both
+have a ``from_json`` classmethod walking an already parsed payload, the
+fallback for dicts and for payloads the typed decoder rejects. Commit the
+regenerated module alongside any change to the swagger file or to this
+generator.
+"""
+
+from __future__ import annotations
+
+import json
+import keyword
+import re
+from pathlib import Path
+from typing import Any
+
+HERE = Path(__file__).resolve().parent
+SWAGGER_PATH = HERE.parent / "apim" / "setlistfm" / "swagger.json"
+OUTPUT_PATH = HERE / "setlistfm_models.py"
+
+# Properties whose values repeat heavily across a page (song titles, venue
+# and city names, country codes...) are interned so equal values share one
+# string object and compare by identity in counters and indexes.
+INTERNED_PROPERTIES = {"name", "sortName", "code", "state", "stateCode", "disambiguation"}
+
+# The swagger document types coordinates as "number" like every other numeric
+# field; they are the only non-integer numbers in the API.
+FLOAT_PROPERTIES = {("json_Coords", "lat"), ("json_Coords", "long")}
+
+# The JSON representation nests the sets of a setlist as {"sets": {"set": [...]}}
+# whereas the swagger definition documents a flat "set" array: the model gets
+# the wrapper as a field and the flat array as a property.
+NESTED_SOURCES = {("json_Setlist", "set"): ("sets", "set")}
+
+HEADER = '''"""Typed setlist.fm models generated from src/apim/setlistfm/swagger.json.
+
+Do not edit by hand: run ``python gen_setlistfm_models.py`` to regenerate.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from serialization import loads
+
+try:
+    import msgspec
+except ImportError:  # every payload goes through loads() and from_json()
+    msgspec = None
+
+T = TypeVar("T")
+
+_intern = sys.intern
+
+if msgspec is not None:
+    # Decoded values form trees without cycles: no need for GC tracking.
+    class _Model(msgspec.Struct, gc=False):
+        pass
+
+    def _model(cls: type[T]) -> type[T]:
+        return cls
+
+else:
+
+    class _Model:
+        __slots__ = ()
+
+        def __init_subclass__(cls, **options: Any) -> None:
+            # Accepts the msgspec.Struct options (rename=...) of the class statements.
+            super().__init_subclass__()
+
+    _model = dataclass(slots=True)
+
+_decoders: dict[type, Any] = {}
+
+
+def _str(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return str(value).strip()
+
+
+def _istr(value: Any) -> str:
+    return _intern(_str(value))
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _nested(payload: dict[str, Any], outer: str, inner: str) -> Any:
+    wrapper = payload.get(outer)
+    if isinstance(wrapper, dict):
+        return wrapper.get(inner)
+    return payload.get(inner)
+
+
+def decode(data: bytes | str | dict[str, Any], model: type[T]) -> T:
+    """Decode a raw JSON payload (or an already parsed dict) into ``model``.
+
+    Raw payloads are decoded by a typed ``msgspec`` decoder when installed;
+    one it rejects (a ``null`` field, an unexpected type) and dicts are walked
+    by ``model.from_json``, which tolerates them. Only ``from_json`` strips
+    and interns strings: doing it in ``__post_init__`` would cost more than
+    the typed decode itself.
+    """
+    if msgspec is not None and isinstance(data, (bytes, bytearray, str)):
+        decoder = _decoders.get(model)
+        if decoder is None:
+            decoder = _decoders[model] = msgspec.json.Decoder(model, strict=False)
+        try:
+            return decoder.decode(data)
+        except msgspec.ValidationError:
+            pass
+    payload = loads(data) if isinstance(data, (bytes, bytearray, str)) else data
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object for {model.__name__}, got {type(payload).__name__}")
+    return model.from_json(payload)  # type: ignore[attr-defined]
+'''
+
+
+def _class_name(definition: str) -> str:
+    return definition.removeprefix("json_")
+
+
+def _attr_name(prop: str) -> str:
+    snake = re.sub(r"(?<!^)(?=[A-Z])", "_", prop).lower()
+    return f"{snake}_" if keyword.iskeyword(snake) else snake
+
+
+def _ref_name(ref: str) -> str:
+    return _class_name(ref.rsplit("/", 1)[-1])
+
+
+def _field(definition: str, prop: str, schema: dict[str, Any]) -> tuple[str, str, str]:
+    """Return (annotation, default, decode expression) for one property."""
+    source = f'get("{prop}")'
+
+    if "$ref" in schema:
+        ref = _ref_name(schema["$ref"])
+        return f"{ref} | None", "None", f"{ref}.from_json(v) if (v := {source}) else None"
+
+    kind = schema.get("type")
+    if kind == "array":
+        items = schema.get("items", {})
+        if "$ref" in items:
+            ref = _ref_name(items["$ref"])
+            return f"tuple[{ref}, ...]", "()", f"tuple(map({ref}.from_json, {source} or ()))"
+        return "tuple[Any, ...]", "()", f"tuple({source} or ())"
+    if kind == "boolean":
+        return "bool", "False", f"bool({source})"
+    if kind == "number":
+        if (definition, prop) in FLOAT_PROPERTIES:
+            return "float", "0.0", f"_float({source})"
+        return "int", "0", f"_int({source})"
+    # Inline the common "already a string" case; it is the hot path when decoding songs.
+    if prop in INTERNED_PROPERTIES:
+        return "str", '""', f"_intern(v.strip()) if (v := {source}).__class__ is str else _istr(v)"
+    return "str", '""', f"v.strip() if (v := {source}).__class__ is str else _str(v)"
+
+
+def _wrapper_name(outer: str) -> str:
+    return outer[:1].upper() + outer[1:]
+
+
+def _class_statement(name: str, renames: dict[str, str]) -> str:
+    if not renames:
+        return f"class {name}(_Model):"
+    options = ", ".join(f'"{attr}": "{key}"' for attr, key in renames.items())
+    return f"class {name}(_Model, rename={{{options}}}):"
+
+
+def render_wrapper(definition: str, prop: str, schema: dict[str, Any]) -> str:
+    """The model of the object wrapping a nested array (``{"sets": {"set": [...]}}``)."""
+    outer, inner = NESTED_SOURCES[(definition, prop)]
+    name = _wrapper_name(outer)
+    attr = _attr_name(inner)
+    annotation, default, expression = _field(definition, inner, schema)
+    return "\n".join(
+        [
+            "@_model",
+            _class_statement(name, {attr: inner} if attr != inner else {}),
+            f'    """``{outer}`` wrapper of the ``{inner}`` array of {_class_name(definition)}."""',
+            "",
+            f"    {attr}: {annotation} = {default}",
+            "",
+            "    @classmethod",
+            f"    def from_json(cls, d: dict[str, Any]) -> {name}:",
+            "        get = d.get",
+            f"        return cls({expression})",
+        ]
+    )
+
+
+def render_class(definition: str, schema: dict[str, Any]) -> str:
+    name = _class_name(definition)
+    title = schema.get("title", name.lower())
+    fields = []
+    properties = []
+    for prop, prop_schema in schema.get("properties", {}).items():
+        if (definition, prop) in NESTED_SOURCES:
+            outer, inner = NESTED_SOURCES[(definition, prop)]
+            wrapper = _wrapper_name(outer)
+            annotation, _, expression = _field(definition, inner, prop_schema)
+            items = expression.replace(f'get("{inner}")', f'_nested(d, "{outer}", "{inner}")')
+            fields.append((_attr_name(outer), outer, f"{wrapper} | None", "None", f"{wrapper}({items})"))
+            properties.append((_attr_name(prop), annotation, f"self.{_attr_name(outer)}.{_attr_name(inner)}"))
+        else:
+            fields.append((_attr_name(prop), prop, *_field(definition, prop, prop_schema)))
+    renames = {attr: prop for attr, prop, *_ in fields if attr != prop}
+
+    lines = [
+        "@_model",
+        _class_statement(name, renames),
+        f'    """setlist.fm ``{title}`` (swagger ``{definition}``)."""',
+        "",
+    ]
+    lines += [f"    {attr}: {annotation} = {default}" for attr, _, annotation, default, _ in fields]
+    for attr, annotation, expression in properties:
+        owner = expression.split(".")[1]
+        lines += [
+            "",
+            "    @property",
+            f"    def {attr}(self) -> {annotation}:",
+            f"        return {expression} if self.{owner} is not None else ()",
+        ]
+    lines += [
+        "",
+        "    @classmethod",
+        f"    def from_json(cls, d: dict[str, Any]) -> {name}:",
+        "        get = d.get",
+        "        return cls(",
+    ]
+    lines += [f"            {expression}," for *_, expression in fields]
+    lines.append("        )")
+    return "\n".join(lines)
+
+
+def _dependencies(schema: dict[str, Any]) -> set[str]:
+    refs = set()
+    for prop in schema.get("properties", {}).values():
+        ref = prop.get("$ref") or prop.get("items", {}).get("$ref")
+        if ref:
+            refs.add(ref.rsplit("/", 1)[-1])
+    return refs
+
+
+def _ordered(definitions: dict[str, Any]) -> list[str]:
+    """Order definitions so every model is declared after the models it references."""
+    ordered: list[str] = []
+
+    def visit(name: str, stack: tuple[str, ...] = ()) -> None:
+        if name in ordered or name in stack:
+            return
+        for dep in sorted(_dependencies(definitions[name])):
+            visit(dep, stack + (name,))
+        ordered.append(name)
+
+    for name in sorted(definitions):
+        visit(name)
+    return ordered
+
+
+def generate(swagger: dict[str, Any]) -> str:
+    definitions = {name: schema for name, schema in swagger["definitions"].items() if name.startswith("json_")}
+    classes = []
+    for name in _ordered(definitions):
+        classes += [render_wrapper(name, prop, definitions[name]["properties"][prop]) for owner, prop in NESTED_SOURCES if owner == name]
+        classes.append(render_class(name, definitions[name]))
+    return HEADER + "\n\n" + "\n\n\n".join(classes) + "\n"
+
+
+def main() -> None:
+    swagger = json.loads(SWAGGER_PATH.read_text(encoding="utf-8"))
+    OUTPUT_PATH.write_text(generate(swagger), encoding="utf-8")
+    print(f"Generated {OUTPUT_PATH.name} from {SWAGGER_PATH.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Event-loop lag monitor for the MCP server.
+
+The server runs synchronous work (logging, JSON serialization, JWT parsing)
+on the event loop between its httpx awaits; while that work runs, every other
+request waits. ``LoopLagMonitor`` makes those stalls visible:
+
+- a probe task sleeps ``interval`` seconds in a loop and records how late it
+  wakes up in the ``event_loop.lag`` histogram (ms);
+- a watchdog thread notices when the probe has not run for ``threshold``
+  seconds and captures the stack of the loop thread *while it is blocked*,
+  logging it and counting it in ``event_loop.stalls``;
+- ``LoopLagMiddleware`` sets the worst lag seen during a request on its span
+  (``event_loop.lag_ms``, ``event_loop.stalled``).
+
+The monitor is toggled at runtime with ``SIGUSR2`` (POSIX) or
+``enable()``/``disable()``; ``LOOP_MONITOR=false`` starts it disabled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from opentelemetry import metrics, trace
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")) / 1000
+
+meter = metrics.get_meter("loop_monitor")
+lag_histogram = meter.create_histogram(
+    "event_loop.lag", unit="ms", description="Delay between scheduled and actual wake-up of the loop probe"
+)
+stall_counter = meter.create_counter(
+    "event_loop.stalls", description="Loop stalls longer than the threshold, with a captured stack"
+)
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag and captures the stack of long stalls."""
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        threshold: float = LOOP_LAG_THRESHOLD,
+        enabled: bool = LOOP_MONITOR,
+        history: int = 600,
+    ):
+        """
+        Args:
+            interval: Seconds between two probes of the loop
+            threshold: Lag in seconds after which the loop stack is captured
+            enabled: Whether probing starts with the loop
+            history: Number of recent lag samples kept for request spans
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.enabled = enabled
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=history)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self.max_lag_ms = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._last_beat = time.monotonic()
+        self._stall_reported = False
+
+    def attach(self) -> None:
+        """Bind to the running loop (idempotent); called on the first request."""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        if hasattr(signal, "SIGUSR2"):
+            try:
+                self._loop.add_signal_handler(signal.SIGUSR2, self.toggle)
+            except (NotImplementedError, RuntimeError, ValueError):
+                logger.debug("SIGUSR2 toggle unavailable on this loop")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        if self.enabled:
+            self._start_probe()
+
+    def _start_probe(self) -> None:
+        if self._loop is not None and (self._task is None or self._task.done()):
+            self._last_beat = time.monotonic()
+            self._task = self._loop.create_task(self._probe(), name="loop-lag-probe")
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(now - expected, 0.0) * 1000
+            self._last_beat = now
+            self._stall_reported = False
+            self.samples.append((now, lag_ms))
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            lag_histogram.record(lag_ms)
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the loop stack while it is blocked."""
+        while True:
+            time.sleep(self.threshold / 2)
+            if not self.enabled or self._stall_reported:
+                continue
+            behind = self.blocked_for()
+            if behind < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore[arg-type]
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<loop thread not found>"
+            self._stall_reported = True
+            self.stalls.append({"at": time.time(), "blocked_ms": round(behind * 1000, 1), "stack": stack})
+            stall_counter.add(1)
+            logger.warning("Event loop blocked for %.0f ms, loop thread stack:\n%s", behind * 1000, stack)
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._start_probe()
+        logger.info("Event-loop lag monitor enabled")
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        logger.info("Event-loop lag monitor disabled")
+
+    def toggle(self) -> None:
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def blocked_for(self) -> float:
+        """Seconds the probe is overdue, i.e. how long the loop has been blocked so far."""
+        return max(time.monotonic() - self._last_beat - self.interval, 0.0)
+
+    def max_lag_since(self, since: float) -> float:
+        """Worst lag (ms) of the samples taken since ``since`` (``time.monotonic()``)."""
+        return max((lag for at, lag in reversed(self.samples) if at >= since), default=0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent: List[float] = [lag for _, lag in self.samples]
+        return {
+            "enabled": self.enabled,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "recent_max_lag_ms": round(max(recent, default=0.0), 1),
+            "stalls": list(self.stalls),
+        }
+
+
+monitor = LoopLagMonitor()
+
+
+class LoopLagMiddleware(Middleware):
+    """Attach the worst event-loop lag seen during each request to its span."""
+
+    def __init__(self, lag_monitor: LoopLagMonitor = monitor):
+        self.monitor = lag_monitor
+
+    async def on_request(self, context: MiddlewareContext, call_next):
+        self.monitor.attach()
+        if not self.monitor.enabled:
+            return await call_next(context)
+        start = time.monotonic()
+        try:
+            return await call_next(context)
+        finally:
+            # The probe only reports once the loop is free again: include the
+            # current stall if the request itself is blocking it.
+            lag_ms = max(self.monitor.max_lag_since(start), self.monitor.blocked_for() * 1000)
+            span = trace.get_current_span()
+            span.set_attribute("event_loop.lag_ms", round(lag_ms, 1))
+            span.set_attribute("event_loop.stalled", lag_ms >= self.monitor.threshold * 1000)
@@ -0,0 +1,120 @@
+"""Run several MCP tool calls concurrently over one fastmcp ``Client`` session.
+
+The demo clients used to await ``call_tool`` one after another (artist search,
+then setlist search), paying one full round trip per call. ``call_tools``
+sends them together over the already-open session:
+
+- at most ``max_concurrency`` requests are in flight at a time;
+- results come back in the order of the calls, whatever order they finish in;
+- each call gets its own deadline, also sent to the server as
+  ``_meta.deadlineMs`` so it stops working when the client stops waiting, and
+  an error on one call does not cancel the others;
+- the latency of every call is recorded next to its result.
+
+JSON-RPC batching (several requests in one HTTP POST) was removed from the
+MCP specification in revision 2025-06-18 and the Python SDK used by fastmcp
+never sends batches, so calls are multiplexed as concurrent requests on the
+session instead: with streamable HTTP they share the pooled connection(s) of
+the transport and overlap their round trips.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastmcp.client import Client
+from mcp.types import CallToolResult
+
+from deadlines import deadline_meta
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCall:
+    """One tool invocation; ``timeout`` (seconds) overrides the batch default."""
+
+    tool: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    timeout: Optional[float] = None
+
+
+@dataclass
+class ToolCallOutcome:
+    """Result, or error, of one ``ToolCall`` and how long it took."""
+
+    call: ToolCall
+    result: Optional[CallToolResult] = None
+    error: Optional[BaseException] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+CallSpec = Union[ToolCall, Tuple[str, Dict[str, Any]]]
+
+
+def _as_call(spec: CallSpec) -> ToolCall:
+    return spec if isinstance(spec, ToolCall) else ToolCall(spec[0], dict(spec[1] or {}))
+
+
+async def call_tools(
+    client: Client,
+    calls: Iterable[CallSpec],
+    max_concurrency: int = 8,
+    timeout: Optional[float] = 30.0,
+) -> List[ToolCallOutcome]:
+    """Run ``calls`` concurrently on an open ``client`` session.
+
+    Args:
+        client: Connected fastmcp client (inside ``async with client``)
+        calls: ``ToolCall`` objects or ``(tool, arguments)`` tuples
+        max_concurrency: Maximum number of requests in flight
+        timeout: Default per-call deadline in seconds, ``None`` for no deadline
+
+    Returns:
+        One ``ToolCallOutcome`` per call, in the order of ``calls``
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(call: ToolCall) -> ToolCallOutcome:
+        deadline = call.timeout if call.timeout is not None else timeout
+        async with semaphore:
+            start = time.perf_counter()
+            outcome = ToolCallOutcome(call)
+            try:
+                # The session enforces the deadline on the response stream, the
+                # server on its upstream calls.
+                outcome.result = await client.call_tool(
+                    call.tool, call.arguments, timeout=deadline, meta=deadline_meta(deadline)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                outcome.error = exc
+            outcome.elapsed_ms = (time.perf_counter() - start) * 1000
+        if outcome.error is not None:
+            logger.warning("%s failed after %.0f ms: %s", call.tool, outcome.elapsed_ms, outcome.error)
+        return outcome
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run(_as_call(spec)) for spec in calls))
+    wall_ms = (time.perf_counter() - start) * 1000
+    logger.info(
+        "%d tool calls in %.0f ms wall-clock (%.0f ms if sequential)",
+        len(outcomes), wall_ms, sum(outcome.elapsed_ms for outcome in outcomes),
+    )
+    return list(outcomes)
+
+
+def print_latencies(outcomes: List[ToolCallOutcome]) -> None:
+    """Print one line per call with its status and latency."""
+    for outcome in outcomes:
+        status = "✅" if outcome.ok else f"❌ {outcome.error}"
+        print(f"⏱️  {outcome.call.tool:<24} {outcome.elapsed_ms:8.1f} ms {status}")
@@ -2,7 +2,9 @@ import asyncio
 import os
 from dotenv import load_dotenv
 from fastmcp.client import Client
-from render import render_artist_table, render_setlist
+from mcp_batch import call_tools, print_latencies
+from render import render_artist_table, render_setlists, tool_payload
+from tool_cache import ToolListCache
 
 load_dotenv()
 
@@ -20,36 +22,40 @@ config= {
         },
     }
 }
+tool_cache = ToolListCache()
 
 async def main():
     try:
-        async with Client( config) as client:
+        async with Client( config, message_handler=tool_cache) as client:
             assert await client.ping()
             print("✅ Successfully authenticated!")
 
-            tools = await client.list_tools()
+            tools = await tool_cache.list_tools(client, SETLISTAPI_MCP_ENDPOINT)
             print(f"🔧 Available tools ({len(tools)}):")
             for tool in tools:
                 print(f"   - {tool.name}")
                 #print(f"     {tool.description}")
                 print(f"     Input Schema: {tool.inputSchema}")
 
+            artistName = "Linkin Park"
+            # Both searches are independent: send them together over the session.
+            searchForArtists, searchForSetlists = await call_tools(client, [
+                ("searchForArtists", {'artistName': 'Coldplay'}),
+                ("searchForSetlists", {'artistName': artistName, 'p': 1}),
+            ])
+            print_latencies([searchForArtists, searchForSetlists])
+
             print("-------" * 18)
             print("🔗 Search for artists with 'Coldplay' in the name")
-            searchForArtists = await client.call_tool(
-                "searchForArtists", arguments={'artistName': 'Coldplay'}
-            )
-            artist_payload = searchForArtists.content[0].text if searchForArtists.content else ""
-            print(render_artist_table(artist_payload))
+            if searchForArtists.ok:
+                artist_payload = tool_payload(searchForArtists.result)
+                print(render_artist_table(artist_payload))
 
             print("-------" * 18)
-            artistName = "Linkin Park"
             print(f"🔗 Get a list of setlists for {artistName}")
-            searchForSetlists = await client.call_tool(
-                "searchForSetlists", arguments={'artistName': artistName, 'p': 1}
-            )
-            setlist_payload = searchForSetlists.content[0].text if searchForSetlists.content else ""
-            print(render_setlist(setlist_payload))
+            if searchForSetlists.ok:
+                setlist_payload = tool_payload(searchForSetlists.result)
+                print(render_setlists(setlist_payload))
     except Exception as e:
         print(f"❌ failure : {e}")
         raise
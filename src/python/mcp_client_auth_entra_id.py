@@ -1,27 +1,31 @@
 import asyncio
 import base64
-import json
 import os
 from dotenv import load_dotenv
 from fastmcp.client import Client
 from fastmcp.client.auth.oauth import OAuth
-from render import render_artist_table, render_setlist
+from mcp_batch import call_tools, print_latencies
+from render import render_artist_table, render_setlists, tool_payload
+from serialization import loads
+from token_cache import AsyncCachedCredential
+from tool_cache import ToolListCache
 
 load_dotenv()
 
 SETLISTAPI_MCP_ENDPOINT = "http://localhost:8000/mcp"
 SETLISTAPI_SUBSCRIPTION_KEY = str(os.getenv("SETLISTAPI_SUBSCRIPTION_KEY"))
 print(f"🔗 Testing connection to {SETLISTAPI_MCP_ENDPOINT}...")
+tool_cache = ToolListCache()
 
 async def azure_client_secret_credential_token():
     print("Using ClientSecretCredential")
-    from azure.identity import ClientSecretCredential
+    from azure.identity.aio import ClientSecretCredential
     client_id = os.getenv("FASTMCP_CLIENT_APP_ID")
     client_secret = os.getenv("FASTMCP_CLIENT_CLIENT_SECRET")
     tenant_id = os.getenv("OAUTH_TENANT_ID")
     
     print(f"Using Client ID: {client_id}")
-    credential = ClientSecretCredential(tenant_id, client_id, client_secret)
+    credential = AsyncCachedCredential(ClientSecretCredential(tenant_id, client_id, client_secret), tenant_id)
     
     # Must use .default for client credential flow
     server_app_id = os.getenv("FASTMCP_SERVER_APP_ID")
@@ -32,29 +36,35 @@ async def azure_client_secret_credential_token():
     scope = f"api://{server_app_id}/.default"
     
     print(f"Requesting token for scope: {scope}")
-    access_token = credential.get_token(scope)
+    async with credential:
+        access_token = await credential.get_token(scope)
     return access_token.token
 
 async def azure_default_credential_token():
     print("Using DefaultAzureCredential")
-    from azure.identity import DefaultAzureCredential, AzureCliCredential
-    credential = AzureCliCredential()
+    from azure.identity.aio import AzureCliCredential
     client_id = os.getenv("ENTRA_PROXY_AZURE_CLIENT_ID", "")
    
     scope = f"api://{client_id}/.default"
     print(f"Requesting token for scope: {scope}")
-    access_token = credential.get_token(scope)
+    # The token is requested from the tenant it is cached under.
+    tenant_id = os.getenv("OAUTH_TENANT_ID", "")
+    async with AsyncCachedCredential(AzureCliCredential(tenant_id=tenant_id or None), tenant_id) as credential:
+        access_token = await credential.get_token(scope)
     return access_token.token
 
 async def get_user_token_from_cli():
     """Get token for authenticated user from Azure CLI"""
-    from azure.identity import AzureCliCredential
+    from azure.identity.aio import AzureCliCredential
     
-    credential = AzureCliCredential()
     server_app_id = os.getenv("FASTMCP_SERVER_APP_ID")
     scope = f"api://{server_app_id}/.default"
     
-    token = credential.get_token(scope)
+    # The async credential runs `az` as an asyncio subprocess instead of blocking the loop.
+    # The token is requested from the tenant it is cached under.
+    tenant_id = os.getenv("OAUTH_TENANT_ID", "")
+    async with AsyncCachedCredential(AzureCliCredential(tenant_id=tenant_id or None), tenant_id) as credential:
+        token = await credential.get_token(scope)
     return token.token
 
 def client_oauth(access_token: str):
@@ -76,7 +86,7 @@ def client_token(access_token: str):
             }
         }
     auth = OAuth(mcp_url="http://localhost:8000/mcp",client_name="MCP Client Auth Entra ID",callback_port=61382)
-    return Client(config, auth=None)
+    return Client(config, auth=None, message_handler=tool_cache)
 
 async def main(access_token: str):
     try:
@@ -84,7 +94,7 @@ async def main(access_token: str):
             assert await client.ping()
             print("✅ Successfully authenticated!")
 
-            tools = await client.list_tools()
+            tools = await tool_cache.list_tools(client, SETLISTAPI_MCP_ENDPOINT)
             print(f"🔧 Available tools ({len(tools)}):")
             for tool in tools:
                 print(f"   - {tool.name}")
@@ -96,16 +106,19 @@ async def main(access_token: str):
             import sys
             sys.exit(1)
 
+            searchForArtists, searchForSetlists = await call_tools(client, [
+                ("getArtists", {'artistName': 'Coldplay'}),
+                ("getSetlists", {'artistName': 'Wolf Alice', 'p': 1}),
+            ])
+            print_latencies([searchForArtists, searchForSetlists])
+
             print("🔗 Search for artists with 'Coldplay' in the name")
-            searchForArtists = await client.call_tool(
-                "getArtists", arguments={'artistName': 'Coldplay'}
-            )
-            #print(searchForArtists)
-            print(render_artist_table(searchForArtists.content[0].text))
+            if searchForArtists.ok:
+                print(render_artist_table(tool_payload(searchForArtists.result)))
 
             print("🔗 Get a list of setlists for Wolf Alice")
-            searchForSetlists = await client.call_tool("getSetlists", arguments={'artistName': 'Wolf Alice', 'p': 1})
-            print(render_setlist(searchForSetlists.content[0].text))
+            if searchForSetlists.ok:
+                print(render_setlists(tool_payload(searchForSetlists.result)))
     except Exception as e:
         print(f"❌ failure : {e}")
         raise
@@ -124,7 +137,7 @@ def decode_token(token: str):
     payload = parts[1]
     payload += '=' * (4 - len(payload) % 4)
     decoded = base64.urlsafe_b64decode(payload)
-    claims = json.loads(decoded)
+    claims = loads(decoded)
     
     print("🔍 Token Claims:")
     print(f"  aud (audience): {claims.get('aud')}")
@@ -3,7 +3,10 @@ import os
 from dotenv import load_dotenv
 from fastmcp.client import Client
 from fastmcp.client.transports import StreamableHttpTransport
-from render import render_artist_table, render_setlist
+from mcp_batch import call_tools, print_latencies
+from render import render_artist_table, render_setlists, tool_payload
+from token_cache import AsyncCachedCredential, msal_token_cache
+from tool_cache import ToolListCache
 
 load_dotenv()
 
@@ -15,44 +18,49 @@ print(f"🔗 Testing connection to {SETLISTAPI_MCP_ENDPOINT}...")
 
 async def azure_default_credential_token():
     print("Using DefaultAzureCredential")
-    from azure.identity import DefaultAzureCredential
-    credential = DefaultAzureCredential()
-    scope = f"api://{os.getenv("OAUTH_APP_ID")}/.default"
-    access_token = credential.get_token(scope)
+    from azure.identity.aio import DefaultAzureCredential
+    scope = f"api://{os.getenv('OAUTH_APP_ID')}/.default"
+    async with AsyncCachedCredential(DefaultAzureCredential(), os.getenv("OAUTH_TENANT_ID", "")) as credential:
+        access_token = await credential.get_token(scope)
     return access_token.token
 
 async def azure_client_secret_credential_token():
     print("Using ClientSecretCredential")
-    from azure.identity import ClientSecretCredential
+    from azure.identity.aio import ClientSecretCredential
     client_id = os.getenv("OAUTH_APP_ID", "")
     # az ad app credential reset --id xxxxxxx
     client_secret = os.getenv("OAUTH_CLIENT_SECRET", "")
     tenant_id = os.getenv("OAUTH_TENANT_ID", "")
-    credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-    scope = f"api://{os.getenv("OAUTH_APP_ID")}/.default"
-    access_token = credential.get_token(scope)
+    scope = f"api://{os.getenv('OAUTH_APP_ID')}/.default"
+    async with AsyncCachedCredential(ClientSecretCredential(tenant_id, client_id, client_secret), tenant_id) as credential:
+        access_token = await credential.get_token(scope)
     return access_token.token
 
 async def msal_token():
     print("Using MSAL ConfidentialClientApplication")
     from msal import ConfidentialClientApplication
-    scope = f"api://{os.getenv("OAUTH_APP_ID")}/.default"
+    scope = f"api://{os.getenv('OAUTH_APP_ID')}/.default"
     client_id = os.getenv("OAUTH_APP_ID")
     client_secret = os.getenv("OAUTH_CLIENT_SECRET")
     tenant_id = os.getenv("OAUTH_TENANT_ID")
+    # Opening the encrypted cache file may block: do it in a worker thread.
+    token_cache = await asyncio.to_thread(msal_token_cache)
     app = ConfidentialClientApplication(
         client_id,
         client_credential=client_secret,
-        authority=f"https://login.microsoftonline.com/{tenant_id}"
+        authority=f"https://login.microsoftonline.com/{tenant_id}",
+        token_cache=token_cache,
     )
 
-    result = app.acquire_token_for_client(scopes=[scope])
+    # MSAL is synchronous: run the token request in a worker thread.
+    result = await asyncio.to_thread(app.acquire_token_for_client, scopes=[scope])
     return result.get("access_token")
 
 
 async def main(access_token: str):
     print("👋 Starting client...")
     print(f"Using access token: {access_token}")
+    tool_cache = ToolListCache()
     config= {
             "mcpServers": {
             "setlist": {
@@ -63,27 +71,30 @@ async def main(access_token: str):
             }
         }
     try:
-        async with Client(config) as client:
+        async with Client(config, message_handler=tool_cache) as client:
             assert await client.ping()
             print("✅ Successfully authenticated!")
 
-            tools = await client.list_tools()
+            tools = await tool_cache.list_tools(client, SETLISTAPI_MCP_ENDPOINT)
             print(f"🔧 Available tools ({len(tools)}):")
             for tool in tools:
                 print(f"   - {tool.name}")
                 # print(f"     {tool.description}")
                 print(f"     Input Schema: {tool.inputSchema}")
 
+            searchForArtists, searchForSetlists = await call_tools(client, [
+                ("searchForArtists", {'artistName': 'Coldplay'}),
+                ("searchForSetlists", {'artistName': 'Wolf Alice', 'p': 1}),
+            ])
+            print_latencies([searchForArtists, searchForSetlists])
+
             print("🔗 Search for artists with 'Coldplay' in the name")
-            searchForArtists = await client.call_tool(
-                "searchForArtists", arguments={'artistName': 'Coldplay'}
-            )
-            #print(searchForArtists)
-            print(render_artist_table(searchForArtists.content[0].text))
+            if searchForArtists.ok:
+                print(render_artist_table(tool_payload(searchForArtists.result)))
 
             print("🔗 Get a list of setlists for Wolf Alice")
-            searchForSetlists = await client.call_tool("searchForSetlists", arguments={'artistName': 'Wolf Alice', 'p': 1})
-            print(render_setlist(searchForSetlists.content[0].text))
+            if searchForSetlists.ok:
+                print(render_setlists(tool_payload(searchForSetlists.result)))
     except Exception as e:
         print(f"❌ failure : {e}")
         raise
@@ -1,12 +1,15 @@
 import asyncio
+import importlib.util
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import httpx
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-import time
 from dotenv import load_dotenv
+from deadlines import deadline_headers
+from serialization import dumpb, loads
+from token_provider import TokenProvider
 load_dotenv()
 
 
@@ -24,7 +27,12 @@ logger = logging.getLogger(__name__)
 
 
 class MCPMslearnSecuredClient:
-    """Client for OAuth-secured mslearn MCP server through Azure APIM gateway."""
+    """Client for OAuth-secured mslearn MCP server through Azure APIM gateway.
+
+    Use it as an async context manager: it owns a single pooled
+    ``httpx.AsyncClient`` shared by the token requests to Entra ID and every
+    call to the gateway, so connections (TCP + TLS) are reused across calls.
+    """
 
     def __init__(
         self,
@@ -33,6 +41,11 @@ class MCPMslearnSecuredClient:
         client_secret: Optional[str] = None,
         tenant_id: Optional[str] = None,
         scope: Optional[str] = None,
+        http2: bool = False,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 8,
     ):
         """
         Initialize the secured MCP client.
@@ -43,6 +56,11 @@ class MCPMslearnSecuredClient:
             client_secret: OAuth client secret (defaults to MCP_MSLEARN_CLIENT_SECRET env var)
             tenant_id: Azure AD tenant ID (defaults to MCP_MSLEARN_TENANT_ID env var)
             scope: OAuth scope (defaults to MCP_MSLEARN_SCOPE env var)
+            http2: Negotiate HTTP/2 when the optional ``h2`` package is installed
+            max_connections: Upper bound of open connections in the pool
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            max_concurrency: Default number of in-flight calls for ``call_tools``
         """
         self.gateway_url = gateway_url or os.getenv("MCP_MSLEARN_GATEWAY_URL")
         self.client_id = client_id or os.getenv("MCP_MSLEARN_CLIENT_ID")
@@ -62,41 +80,53 @@ class MCPMslearnSecuredClient:
         logger.info("Using Tenant ID: %s", self.tenant_id)
         logger.info("Using Scope: %s", self.scope)
 
-        self._access_token: Optional[str] = None
-        self._token_expires_at: float = 0.0
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_concurrency = max_concurrency
+        self._http: Optional[httpx.AsyncClient] = None
+        self._tokens = TokenProvider.client_credentials(
+            self._client, self.tenant_id, self.client_id, self.client_secret, self.scope
+        )
+
+    async def __aenter__(self) -> "MCPMslearnSecuredClient":
+        self._client()
+        self._tokens.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    def _client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, creating it on first use."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+        return self._http
+
+    async def aclose(self) -> None:
+        """Stop the token refresh and close the pooled HTTP client and its connections."""
+        await self._tokens.aclose()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def _get_access_token(self) -> str:
         """
         Retrieve OAuth access token using client credentials flow.
 
+        Concurrent callers share a single refresh; inside ``async with`` the
+        token is renewed in the background before it expires.
+
         Returns:
             Access token string
         """
-
-        # Return cached token if still valid
-        if self._access_token and time.time() < self._token_expires_at - 60:
-            return self._access_token
-
-        token_url = f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
-
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "scope": self.scope,
-        }
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=data)
-            response.raise_for_status()
-            token_data = response.json()
-
-            self._access_token = token_data["access_token"]
-            expires_in = token_data.get("expires_in", 3600)
-            self._token_expires_at = time.time() + expires_in
-
-            logger.info("Successfully obtained OAuth access token")
-            return self._access_token
+        return await self._tokens.get_token()
 
     async def list_tools(self) -> List[Dict[str, Any]]:
         """
@@ -108,20 +138,21 @@ class MCPMslearnSecuredClient:
         token = await self._get_access_token()
         headers = {"Authorization": f"Bearer {token}"}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.gateway_url}/tools", headers=headers, timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client().get(
+            f"{self.gateway_url}/tools", headers=headers, timeout=30.0
+        )
+        response.raise_for_status()
+        return loads(response.content)
 
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], timeout: float = 60.0) -> Any:
         """
         Call a tool on the MCP server.
 
         Args:
             tool_name: Name of the tool to call
             arguments: Tool arguments
+            timeout: Seconds to wait for the result, also sent to the server
+                as the deadline of the call
 
         Returns:
             Tool execution result
@@ -130,19 +161,46 @@ class MCPMslearnSecuredClient:
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
+            **deadline_headers(timeout),
         }
 
         payload = {"name": tool_name, "arguments": arguments}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.gateway_url}/tools/call",
-                headers=headers,
-                json=payload,
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client().post(
+            f"{self.gateway_url}/tools/call",
+            headers=headers,
+            content=dumpb(payload),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return loads(response.content)
+
+    async def call_tools(
+        self,
+        calls: Sequence[Tuple[str, Dict[str, Any]]],
+        max_concurrency: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Call several tools concurrently over the shared connection pool.
+
+        Args:
+            calls: (tool_name, arguments) pairs
+            max_concurrency: In-flight calls limit (defaults to the client setting)
+
+        Returns:
+            One entry per call, in the order of ``calls``: the tool result, or
+            the exception raised by that call
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def bounded(tool_name: str, arguments: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await self.call_tool(tool_name, arguments)
+
+        return await asyncio.gather(
+            *(bounded(tool_name, arguments) for tool_name, arguments in calls),
+            return_exceptions=True,
+        )
 
     async def list_resources(self) -> List[Dict[str, Any]]:
         """
@@ -154,30 +212,28 @@ class MCPMslearnSecuredClient:
         token = await self._get_access_token()
         headers = {"Authorization": f"Bearer {token}"}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.gateway_url}/resources", headers=headers, timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._client().get(
+            f"{self.gateway_url}/resources", headers=headers, timeout=30.0
+        )
+        response.raise_for_status()
+        return loads(response.content)
 
 
 async def main() -> None:
     """Example usage of the secured MCP mslearn client."""
     try:
-        client = MCPMslearnSecuredClient()
-
-        logger.info("Listing available tools...")
-        tools = await client.list_tools()
-        logger.info(f"Available tools: {[t.get('name') for t in tools]}")
-
-        logger.info("Listing available resources...")
-        resources = await client.list_resources()
-        logger.info(f"Available resources: {len(resources)} found")
-
-        # Example tool call (adjust based on actual mslearn tools)
-        # result = await client.call_tool("search_modules", {"query": "azure"})
-        # logger.info(f"Tool result: {result}")
+        async with MCPMslearnSecuredClient() as client:
+            logger.info("Listing available tools...")
+            tools = await client.list_tools()
+            logger.info(f"Available tools: {[t.get('name') for t in tools]}")
+
+            logger.info("Listing available resources...")
+            resources = await client.list_resources()
+            logger.info(f"Available resources: {len(resources)} found")
+
+            # Example tool calls (adjust based on actual mslearn tools)
+            # results = await client.call_tools([("search_modules", {"query": "azure"}), ("search_modules", {"query": "apim"})])
+            # logger.info(f"Tool results: {results}")
 
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
@@ -4,6 +4,7 @@ import asyncio
 import logging
 import os
 import uuid
+from contextlib import asynccontextmanager
 from datetime import date
 from enum import Enum
 from typing import Annotated
@@ -15,6 +16,7 @@ from azure.monitor.opentelemetry import configure_azure_monitor
 
 from dotenv import load_dotenv
 from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ToolError
 from fastmcp.server.auth.providers.azure import AzureProvider
 from fastmcp.server.dependencies import get_access_token
 from fastmcp.server.middleware import Middleware, MiddlewareContext
@@ -25,10 +27,28 @@ from opentelemetry.instrumentation.starlette import StarletteInstrumentor
 from pydantic import AnyHttpUrl
 from rich.console import Console
 from rich.logging import RichHandler
+from starlette.middleware import Middleware as StarletteMiddleware
 from starlette.responses import JSONResponse
 import uvicorn
 
+from artist_batch import BATCH_MAX_ARTISTS, BATCH_MAX_CONCURRENCY, resolve_artists
+from artist_history import HISTORY_MAX_PAGES, crawl_artist_history
+from artist_index import ArtistIndex, ArtistIndexMiddleware
+from cache_warmer import CacheWarmer, ToolCallLogMiddleware, tool_routes
+from compression import CompressionMiddleware
+from deadlines import DeadlineMiddleware, DeadlineTransport
+from loop_monitor import LoopLagMiddleware
 from opentelemetry_middleware import OpenTelemetryMiddleware
+from profiler import profile_endpoint
+from partial_results import ProgressReporter
+from rate_limit import RateLimitTransport
+from setlist_mirror import SetlistMirror, SetlistMirrorMiddleware
+from setlist_search import SEARCH_LIMIT, SearchableSetlistStore
+from shared_cache import shared_cache_from_url
+from static_responses import StaticResponse, StaticResponseMiddleware
+from structured_content import StructuredContentMiddleware, apply_output_schema
+from tool_cache import server_tools_fingerprint
+from upstream_cache import CachingTransport
 
 RUNNING_IN_PRODUCTION = os.getenv("RUNNING_IN_PRODUCTION", "false").lower() == "true"
 
@@ -151,12 +171,15 @@ headers = {
     "Accept": "application/json",
     "User-Agent": "setlistfm-mcp/1.0"
 }
+# CachingTransport rejects malformed IDs and caches responses, in process and, with
+# SHARED_CACHE_URL, across replicas; RateLimitTransport keeps the requests sent upstream
+# by the tools, the mirror sync and the cache warm-up under the API key's rate limit;
+# DeadlineTransport cancels upstream calls once the MCP caller's deadline has passed.
 client = httpx.AsyncClient(base_url="https://api.setlist.fm/rest",
-                           headers=headers)
-mcp = FastMCP.from_openapi(openapi_spec=httpx.get("https://api.setlist.fm/docs/1.0/ui/swagger.json").json(), 
-                           client=client,
-                           name="EntraID SetList FM MCP", version="0.1.0",
-                           mcp_names={
+                           headers=headers,
+                           transport=CachingTransport(RateLimitTransport(DeadlineTransport()), shared=shared_cache_from_url()))
+openapi_spec = httpx.get("https://api.setlist.fm/docs/1.0/ui/swagger.json").json()
+mcp_names = {
                                 "resource__1.0_artist__mbid__getArtist_GET": "getArtist",
                                 "resource__1.0_artist__mbid__setlists_getArtistSetlists_GET": "getArtistSetlists",
                                 "resource__1.0_city__geoId__getCity_GET": "getCity",
@@ -172,8 +195,35 @@ mcp = FastMCP.from_openapi(openapi_spec=httpx.get("https://api.setlist.fm/docs/1
                                 "resource__1.0_user__userId__edited_getUserEditedSetlists_GET": "getUserEditedSetlists",
                                 "resource__1.0_venue__venueId__getVenue_GET": "getVenue",
                                 "resource__1.0_venue__venueId__setlists_getVenueSetlists_GET": "getVenueSetlists",
-                            },
-                           auth=auth, middleware=[OpenTelemetryMiddleware("SetListFM_MCP"), UserAuthMiddleware()])
+                            }
+SERVER_VERSION = "0.4.0"
+# Artist name -> MBID index, shared by the artist search middleware and getArtistsBatch.
+artist_index = ArtistIndex()
+# Setlists of the WATCHED_ARTISTS are mirrored locally and served without upstream calls.
+# The mirror store also carries the full-text index behind searchMirroredSetlists.
+setlist_store = SearchableSetlistStore()
+setlist_mirror = SetlistMirror.from_http(client, store=setlist_store)
+# Popular upstream requests are prefetched into the response cache before /ready passes.
+cache_warmer = CacheWarmer(client, tool_routes(openapi_spec, mcp_names))
+
+
+@asynccontextmanager
+async def lifespan(server):
+    # Every tool is registered by now: the advertised version gets a fingerprint of
+    # the tools/list result, so clients caching it (tool_cache.py) refetch whenever a
+    # generated or hand-written tool changes. FastMCP has no setter for the version.
+    server._mcp_server.version = f"{SERVER_VERSION}+{await server_tools_fingerprint(server)}"
+    async with setlist_mirror.lifespan(server), cache_warmer.lifespan(server):
+        yield
+
+
+mcp = FastMCP.from_openapi(openapi_spec=openapi_spec,
+                           client=client,
+                           name="EntraID SetList FM MCP", version=SERVER_VERSION,
+                           mcp_names=mcp_names,
+                           mcp_component_fn=apply_output_schema,
+                           lifespan=lifespan,
+                           auth=auth, middleware=[OpenTelemetryMiddleware("SetListFM_MCP"), LoopLagMiddleware(), DeadlineMiddleware(), UserAuthMiddleware(), ToolCallLogMiddleware(), StructuredContentMiddleware(), ArtistIndexMiddleware(artist_index), SetlistMirrorMiddleware(setlist_mirror)])
 
 
 # Create the MCP server
@@ -200,15 +250,103 @@ async def get_user_info(ctx: Context) -> dict:
         "office_location": token.claims.get("office_location")
     }
 
-@mcp.custom_route("/health", methods=["GET"])
-async def health_check(_request):
-    """Health check endpoint for service availability."""
-    return JSONResponse({"status": "healthy", "service": "mcp-server"})
+@mcp.tool
+async def searchMirroredSetlists(
+    song: Annotated[str | None, "Song title, e.g. 'Paranoid Android'"] = None,
+    venue: Annotated[str | None, "Venue name"] = None,
+    city: Annotated[str | None, "City name"] = None,
+    text: Annotated[str | None, "Words matched in any field (artist, songs, venue, city, country)"] = None,
+    artistMbid: Annotated[str | None, "Only setlists of this artist"] = None,
+    countryCode: Annotated[str | None, "ISO country code of the venue, e.g. 'GB'"] = None,
+    dateFrom: Annotated[str | None, "First event date, yyyy-MM-dd (or yyyy)"] = None,
+    dateTo: Annotated[str | None, "Last event date, yyyy-MM-dd (or yyyy)"] = None,
+    limit: Annotated[int, "Maximum number of setlists returned"] = SEARCH_LIMIT,
+) -> dict:
+    """Full-text search of the locally mirrored setlists: which shows included a song, or were played at a venue or in a city.
+
+    Results are ranked best match first and list the matching songs. Only the
+    watched artists are mirrored; for other artists use getArtistSetlists.
+    """
+    try:
+        hits, total = await asyncio.to_thread(
+            setlist_store.search, song, venue, city, text, artistMbid, countryCode, dateFrom, dateTo, min(limit, 100)
+        )
+    except ValueError as exc:
+        raise ToolError(str(exc)) from None
+    staleness = await asyncio.to_thread(setlist_mirror.staleness)
+    return {
+        "type": "setlistSearch",
+        "total": total,
+        "setlist": hits,
+        "mirroredArtists": {mbid: status["name"] for mbid, status in staleness.items()},
+    }
+
+@mcp.tool
+async def getArtistsBatch(
+    artists: Annotated[list[str], f"Artist names or MusicBrainz MBIDs, at most {BATCH_MAX_ARTISTS}"],
+    maxConcurrency: Annotated[int, "Artists resolved at the same time"] = BATCH_MAX_CONCURRENCY,
+    ctx: Context = None,
+) -> dict:
+    """Resolve several artists at once: one call instead of one getArtists call per artist.
+
+    Each item gives the best matching artist (MBID, name, disambiguation) or
+    its own error; use the MBIDs with getArtistSetlists or getSetlists.
+    """
+    reporter = ProgressReporter(ctx, "getArtistsBatch")
+    await reporter.open()
+
+    async def on_item(done, total, item):
+        await reporter.partial(item)
+        await reporter.progress(done, total, item["query"])
+
+    try:
+        return await resolve_artists(client, artists, artist_index, min(maxConcurrency, BATCH_MAX_CONCURRENCY), on_item)
+    except ValueError as exc:
+        raise ToolError(str(exc)) from None
+
+
+@mcp.tool
+async def getArtistHistory(
+    mbid: Annotated[str, "MusicBrainz MBID of the artist"],
+    maxPages: Annotated[int, f"Pages of 20 setlists read at most (up to {HISTORY_MAX_PAGES})"] = 10,
+    ctx: Context = None,
+) -> dict:
+    """Read the setlist history of an artist, newest first, and return aggregates:
+    number of shows, most played songs, openers, closers, encores and show lengths.
+
+    Reports progress per page and streams each page's shows as partial results;
+    cancel the request to stop early.
+    """
+    reporter = ProgressReporter(ctx, "getArtistHistory")
+    await reporter.open()
+    try:
+        return await crawl_artist_history(setlist_mirror.fetch_page, mbid, reporter, min(max(maxPages, 1), HISTORY_MAX_PAGES))
+    except httpx.HTTPStatusError as exc:
+        raise ToolError(f"HTTP error {exc.response.status_code} while reading the history of {mbid}") from None
+
+# Health check endpoint for service availability, served from pre-serialized bytes.
+health_check = StaticResponse.json({"status": "healthy", "service": "mcp-server"})
+mcp.custom_route("/health", methods=["GET", "HEAD"])(health_check)
+
+# Readiness probe: 503 until the cache warm-up has ended.
+mcp.custom_route("/ready", methods=["GET"])(cache_warmer.ready_endpoint)
+
+@mcp.custom_route("/mirror/status", methods=["GET"])
+async def mirror_status(_request):
+    """Staleness of the local setlist mirror, per watched artist."""
+    return JSONResponse(await asyncio.to_thread(setlist_mirror.staleness))
+
 
+@mcp.custom_route("/debug/profile", methods=["GET"])
+async def debug_profile(request):
+    """CPU sampling profile (collapsed stacks) or tracemalloc diff, for the admin app role only."""
+    return await profile_endpoint(request, auth)
 
 # Configure Starlette middleware for OpenTelemetry
 # We must do this *after* defining all the MCP server routes
-app = mcp.http_app()
+# The OAuth metadata documents under /.well-known/ are replayed from bytes after their first request.
+# Responses, SSE streams included, are compressed with the encoding negotiated from Accept-Encoding.
+app = mcp.http_app(middleware=[StarletteMiddleware(CompressionMiddleware), StarletteMiddleware(StaticResponseMiddleware)])
 StarletteInstrumentor.instrument_app(app)
 
 if __name__ == "__main__":
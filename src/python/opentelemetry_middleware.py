@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 from typing import Any
@@ -19,6 +18,8 @@ from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.trace import Status, StatusCode
 from opentelemetry.util.types import AttributeValue
 
+from serialization import dumps
+
 
 def configure_aspire_dashboard(service_name: str = "expenses-mcp"):
     """Configure OpenTelemetry to send telemetry to the Aspire standalone dashboard.
@@ -80,7 +81,7 @@ class OpenTelemetryMiddleware(Middleware):
         if value is None:
             return None
         try:
-            return json.dumps(value, ensure_ascii=False, default=str)
+            return dumps(value, default=str)
         except Exception:
             return str(value)
 
@@ -0,0 +1,216 @@
+"""Progress and partial results of long-running fan-out tools.
+
+Tools that walk many upstream pages (``getArtistHistory``) or resolve many
+items (``getArtistsBatch``) used to be silent until their final result. On the
+server, ``ProgressReporter`` lets them:
+
+- send MCP progress notifications (``notifications/progress``) when the
+  client asked for them with a ``progressToken``;
+- stream partial results when the client opted in with
+  ``_meta.partialResults`` (a stream id): each one is a log notification of
+  the ``partial_results`` logger, sent on the request's streamable-HTTP/SSE
+  stream, carrying the stream id, the JSON-RPC request id, a sequence number
+  and the data. MCP has no partial-result message, log notifications are the
+  one server-to-client channel bound to a request that accepts any JSON.
+  ``open`` announces the stream (sequence 0, no data) when the tool starts,
+  so the client learns the request id before the first result;
+- stop when the client cancels the request (``notifications/cancelled``): the
+  MCP server cancels the tool, which stops its upstream calls, and
+  ``fanout.cancelled`` counts it.
+
+On the client, pass a ``PartialResults`` instance as the fastmcp ``Client``
+``log_handler`` and iterate ``async with partials.stream(client, tool,
+arguments) as stream``: partial results are yielded as they arrive,
+``time_to_first_result_ms`` is recorded, and leaving the block early cancels
+the call on the server. The cancellation names the request id the server
+echoed for the stream; leaving before the stream was announced defers it
+until the announcement arrives.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastmcp import Client, Context
+from fastmcp.client.logging import LogMessage, default_log_handler
+from mcp.types import CallToolResult, CancelledNotification, CancelledNotificationParams, ClientNotification
+from opentelemetry import metrics
+
+from deadlines import deadline_meta
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_RESULTS_META_KEY = "partialResults"
+PARTIAL_RESULTS_LOGGER = "partial_results"
+
+meter = metrics.get_meter("partial_results")
+time_to_first_result = meter.create_histogram(
+    "fanout.time_to_first_result", unit="ms", description="Time from the start of a fan-out tool to its first partial result"
+)
+cancelled = meter.create_counter("fanout.cancelled", description="Fan-out tools cancelled by the client before the end")
+
+
+class ProgressReporter:
+    """Progress notifications and partial results of the current tool call."""
+
+    def __init__(self, ctx: Optional[Context], tool: str = ""):
+        self.ctx = ctx
+        self.tool = tool
+        request_context = ctx.request_context if ctx is not None else None
+        meta = request_context.meta if request_context is not None else None
+        self.stream_id = getattr(meta, PARTIAL_RESULTS_META_KEY, None) if meta is not None else None
+        self.sequence = 0
+        self.started = time.perf_counter()
+
+    async def progress(self, done: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        if self.ctx is None:
+            return
+        try:
+            await self.ctx.report_progress(done, total, message)
+        except Exception as exc:
+            logger.debug("Progress notification failed: %s", exc)
+
+    async def open(self) -> None:
+        """Announce the stream to the client, before any partial result."""
+        if self.ctx is None or not self.stream_id:
+            return
+        await self._send("partial results stream opened", None)
+
+    async def partial(self, data: Any) -> None:
+        """Send ``data`` as the next partial result, if the client asked for them."""
+        if self.ctx is None or not self.stream_id:
+            return
+        self.sequence += 1
+        if self.sequence == 1:
+            time_to_first_result.record((time.perf_counter() - self.started) * 1000, {"mcp.tool.name": self.tool})
+        await self._send(f"partial result {self.sequence}", data)
+
+    async def _send(self, message: str, data: Any) -> None:
+        # The raw JSON-RPC id (``ctx.request_id`` is stringified), cancellations are matched on it.
+        request_id = self.ctx.request_context.request_id
+        extra = {"stream": self.stream_id, "requestId": request_id, "sequence": self.sequence, "data": data}
+        try:
+            await self.ctx.log(message, level="info", logger_name=PARTIAL_RESULTS_LOGGER, extra=extra)
+        except Exception as exc:
+            logger.debug("Partial result notification failed: %s", exc)
+
+    def cancelled(self, detail: str) -> None:
+        """Record a cancellation by the client; call it before re-raising ``CancelledError``."""
+        cancelled.add(1, {"mcp.tool.name": self.tool})
+        logger.info("%s cancelled by the client after %s", self.tool, detail)
+
+
+class PartialResults:
+    """fastmcp ``log_handler`` routing partial results to the stream that asked for them."""
+
+    def __init__(self, fallback=default_log_handler):
+        self.fallback = fallback
+        self._queues: Dict[str, asyncio.Queue] = {}
+        # Streams left before the server announced them: cancelled once it does.
+        self._pending_cancels: Dict[str, Client] = {}
+
+    async def __call__(self, message: LogMessage) -> None:
+        data = message.data if isinstance(message.data, dict) else {}
+        extra = data.get("extra") or {}
+        stream_id = extra.get("stream") if message.logger == PARTIAL_RESULTS_LOGGER else None
+        client = self._pending_cancels.pop(stream_id, None)
+        if client is not None:
+            await send_cancel(client, extra.get("requestId"))
+            return
+        queue = self._queues.get(stream_id)
+        if queue is None:
+            await self.fallback(message)
+            return
+        queue.put_nowait(extra)
+
+    def stream(self, client: Client, tool: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> ToolStream:
+        return ToolStream(self, client, tool, arguments, timeout)
+
+
+class ToolStream:
+    """One tool call with its partial results; ``result`` is set once the call completes."""
+
+    def __init__(self, partials: PartialResults, client: Client, tool: str, arguments: Dict[str, Any], timeout: Optional[float]):
+        self.partials = partials
+        self.client = client
+        self.tool = tool
+        self.arguments = arguments
+        self.timeout = timeout
+        self.stream_id = uuid.uuid4().hex
+        self.request_id: Any = None
+        self.result: Optional[CallToolResult] = None
+        self.time_to_first_result_ms: Optional[float] = None
+        self._events: Optional[AsyncIterator[Any]] = None
+
+    async def __aenter__(self) -> ToolStream:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        # Closing the generator right away cancels a call the caller stopped reading.
+        if self._events is not None:
+            await self._events.aclose()
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        self._events = self._iterate()
+        return self._events
+
+    async def _iterate(self) -> AsyncIterator[Any]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.partials._queues[self.stream_id] = queue
+        meta = {PARTIAL_RESULTS_META_KEY: self.stream_id, **(deadline_meta(self.timeout) or {})}
+        start = time.perf_counter()
+        call = asyncio.create_task(self.client.call_tool(self.tool, self.arguments, timeout=self.timeout, meta=meta))
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait({get, call}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    break
+                partial = get.result()
+                self.request_id = partial.get("requestId")
+                if not partial.get("sequence"):
+                    continue
+                if self.time_to_first_result_ms is None:
+                    self.time_to_first_result_ms = (time.perf_counter() - start) * 1000
+                yield partial.get("data")
+            # The call is over: hand out what arrived before its response.
+            while not queue.empty():
+                partial = queue.get_nowait()
+                if partial.get("sequence"):
+                    yield partial.get("data")
+            self.result = call.result()
+        finally:
+            self.partials._queues.pop(self.stream_id, None)
+            while not queue.empty():
+                self.request_id = queue.get_nowait().get("requestId")
+            if not call.done():
+                await self._cancel(call)
+
+    async def _cancel(self, call: asyncio.Task) -> None:
+        """Stop the call on the server too, as soon as the server has named its request id."""
+        if self.request_id is not None:
+            await send_cancel(self.client, self.request_id)
+        else:
+            self.partials._pending_cancels[self.stream_id] = self.client
+        call.cancel()
+        try:
+            await call
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+async def send_cancel(client: Client, request_id: Any) -> None:
+    """Send ``notifications/cancelled`` for the request ``request_id`` of ``client``."""
+    notification = CancelledNotification(
+        method="notifications/cancelled",
+        params=CancelledNotificationParams(requestId=request_id, reason="Client has enough results"),
+    )
+    try:
+        await client.session.send_notification(ClientNotification(notification))
+    except Exception as exc:
+        logger.debug("Cancellation notification failed: %s", exc)
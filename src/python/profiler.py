@@ -0,0 +1,138 @@
+"""On-demand diagnostics for the live MCP server.
+
+``/debug/profile`` (registered in ``mcp_server_auth_entra_id.py``) runs one of
+two captures for ``seconds`` seconds and returns it as a text download:
+
+- ``mode=cpu``: a sampling profile. A worker thread reads the stacks of all
+  other threads from ``sys._current_frames()`` every ``interval_ms`` and the
+  result is written in the collapsed-stack format understood by
+  ``flamegraph.pl``, speedscope and Grafana/Pyroscope (``frame;frame;leaf count``).
+  Nothing is instrumented, so the overhead is one stack walk per interval.
+- ``mode=memory``: a ``tracemalloc`` snapshot diff between the start and the
+  end of the window, largest growth first. Tracing is only switched on for the
+  duration of the capture.
+
+Custom routes are not covered by the MCP auth middleware, so ``authorize``
+checks the bearer token itself and requires the ``PROFILER_ADMIN_ROLE`` app
+role (``mcp.admin`` by default, see ``app_roles_merged.json``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+logger = logging.getLogger(__name__)
+
+PROFILER_ADMIN_ROLE = os.getenv("PROFILER_ADMIN_ROLE", "mcp.admin")
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+# One capture at a time: two samplers would profile each other.
+_busy = asyncio.Lock()
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> Counter:
+    """Sample the stacks of every other thread; blocking, run it in a worker thread.
+
+    Returns a ``Counter`` of collapsed stacks (root first, ``;``-separated).
+    """
+    own = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_label(frame))
+                frame = frame.f_back
+            frames.append(names.get(thread_id, f"thread-{thread_id}"))
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    """Render sampled stacks in the collapsed (folded) flamegraph format."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def tracemalloc_diff(seconds: float, top: int = 50, frames: int = 10) -> str:
+    """Return the ``top`` allocation sites that grew the most over ``seconds``."""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "traceback")
+    lines = [f"# tracemalloc diff over {seconds:.0f}s, top {top} by size growth"]
+    for stat in stats[:top]:
+        lines.append(f"{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks (now {stat.size / 1024:.1f} KiB)")
+        lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+async def authorize(request: Request, auth: Any, role: str = PROFILER_ADMIN_ROLE) -> Optional[Response]:
+    """Return an error response unless the bearer token carries ``role``."""
+    header = request.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return PlainTextResponse("Missing bearer token", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    access_token = await auth.verify_token(token) if auth is not None else None
+    if access_token is None:
+        return PlainTextResponse("Invalid token", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    roles = (getattr(access_token, "claims", None) or {}).get("roles") or []
+    if role not in roles:
+        logger.warning("Profiler access denied to %s: missing role %s", access_token.client_id, role)
+        return PlainTextResponse(f"The '{role}' app role is required", status_code=403)
+    return None
+
+
+async def profile_endpoint(request: Request, auth: Any) -> Response:
+    """Handle ``GET /debug/profile?seconds=10&mode=cpu|memory&interval_ms=10``."""
+    denied = await authorize(request, auth)
+    if denied is not None:
+        return denied
+    try:
+        seconds = min(float(request.query_params.get("seconds", "10")), PROFILER_MAX_SECONDS)
+        interval = max(float(request.query_params.get("interval_ms", "10")), 1.0) / 1000
+    except ValueError:
+        return PlainTextResponse("seconds and interval_ms must be numbers", status_code=400)
+    mode = request.query_params.get("mode", "cpu")
+    if mode not in ("cpu", "memory"):
+        return PlainTextResponse("mode must be 'cpu' or 'memory'", status_code=400)
+    if _busy.locked():
+        return PlainTextResponse("A capture is already running", status_code=409)
+
+    async with _busy:
+        logger.info("Running %s profile for %.0fs", mode, seconds)
+        if mode == "cpu":
+            body = collapsed(await asyncio.to_thread(sample_stacks, seconds, interval))
+            filename = "profile.folded"
+        else:
+            body = await tracemalloc_diff(seconds)
+            filename = "tracemalloc.txt"
+    return PlainTextResponse(body, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,94 @@
+"""One rate limit for every setlist.fm request of the server.
+
+setlist.fm allows ``UPSTREAM_RATE`` (2) requests per second per API key. The
+generated tools, ``getArtistsBatch``, ``getArtistHistory``, the mirror sync
+(``setlist_mirror.py``) and the cache warm-up (``cache_warmer.py``) all share
+the server's ``httpx.AsyncClient`` and its key, so the limit is enforced once,
+at the transport level: ``RateLimitTransport`` sits in that client's chain
+below the response cache, and only requests actually sent upstream draw from
+its ``RateLimiter``.
+
+The limiter is a token bucket kept as a theoretical arrival time (GCRA): each
+request reserves the next free slot and sleeps until it, ``UPSTREAM_BURST``
+requests may go out back to back after an idle period. Reservations are
+first come, first served. A request whose slot lies beyond the caller's
+deadline (``deadlines.py``) fails at once instead of waiting for nothing.
+
+``upstream_rate_limit.wait`` records how long requests waited for their slot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+from opentelemetry import metrics
+
+from deadlines import remaining
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "2"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "1"))
+
+meter = metrics.get_meter("rate_limit")
+wait_time = meter.create_histogram(
+    "upstream_rate_limit.wait", unit="ms", description="Time setlist.fm requests waited for a slot of the rate limit"
+)
+
+
+class RateLimiter:
+    """Token bucket of ``rate`` requests per second and ``burst`` tokens."""
+
+    def __init__(self, rate: float = UPSTREAM_RATE, burst: int = UPSTREAM_BURST):
+        if rate <= 0:
+            raise ValueError(f"UPSTREAM_RATE must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"UPSTREAM_BURST must be at least 1, got {burst}")
+        self.interval = 1 / rate
+        self.burst = burst
+        # Theoretical arrival time of the next request when the bucket is empty.
+        self._tat = 0.0
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Reserve the next slot and return the seconds to wait for it.
+
+        Returns ``None``, reserving nothing, when the wait would exceed ``max_wait``.
+        """
+        now = time.monotonic()
+        tat = max(self._tat, now)
+        wait = max(0.0, tat - now - (self.burst - 1) * self.interval)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self._tat = tat + self.interval
+        return wait
+
+    async def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Wait for a slot; ``False`` when none is free within ``max_wait`` seconds."""
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        wait_time.record(wait * 1000)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class RateLimitTransport(httpx.AsyncBaseTransport):
+    """httpx transport sending requests no faster than its ``RateLimiter`` allows."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, limiter: Optional[RateLimiter] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not await self.limiter.acquire(remaining()):
+            raise httpx.TimeoutException("Request deadline exceeded waiting for the setlist.fm rate limit", request=request)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
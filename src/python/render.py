@@ -1,87 +1,160 @@
 from __future__ import annotations
 
-import json
-from typing import List, Optional, Sequence, Tuple
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+from setlist_analytics import SetlistAnalytics
+from serialization import dumps
+from setlistfm_models import Artist, Artists, Setlist, Setlists, decode
 
-def render_artist_table(raw_payload: str, limit: int = 5) -> str:
-    try:
-        payload = json.loads(raw_payload)
-    except json.JSONDecodeError:
-        return raw_payload
-
-    artists = payload.get("artist") or []
-    rows = [
-        (
-            str(artist.get("name", "")).strip(),
-            str(artist.get("url", "")).strip(),
-        )
-        for artist in artists
-    ]
 
-    rows = [(name, url) for name, url in rows if name or url]
-    if not rows:
-        return "(no artist entries returned)"
+# A tool result payload: structuredContent as returned by the server, or the
+# JSON text of servers that only emit text blocks.
+Payload = Union[str, bytes, Dict[str, Any]]
+
+
+def _as_text(raw_payload: Payload) -> str:
+    if isinstance(raw_payload, dict):
+        return dumps(raw_payload)
+    return raw_payload if isinstance(raw_payload, str) else raw_payload.decode("utf-8", "replace")
+
+
+def tool_payload(result: Any) -> Payload:
+    """Return the structured content of a tool result, or its first text block."""
+    structured = getattr(result, "structured_content", None)
+    if structured is not None:
+        return structured
+    content = getattr(result, "content", None) or []
+    return getattr(content[0], "text", "") if content else ""
+
+
+def _table_lines(rows: Iterable[Tuple[str, str]]) -> Iterator[str]:
+    """Yield a two-column markdown table, columns sized on every row."""
+    head = list(rows)
+    if not head:
+        yield "(no artist entries returned)"
+        return
+
+    name_width = max(len("Name"), *(len(name) for name, _ in head))
+    url_width = max(len("URL"), *(len(url) for _, url in head))
+
+    yield f"| {'Name'.ljust(name_width)} | {'URL'.ljust(url_width)} |"
+    yield f"| {'-' * name_width} | {'-' * url_width} |"
+    for name, url in head:
+        yield f"| {name.ljust(name_width)} | {url.ljust(url_width)} |"
+
+
+def _artist_rows(artists: Iterable[Artist], limit: int) -> Iterator[Tuple[str, str]]:
+    rows = ((artist.name, artist.url) for artist in artists if artist.name or artist.url)
+    return islice(rows, limit) if limit > 0 else rows
+
+
+def _setlist_lines(setlist: Setlist) -> List[str]:
+    """Render one show, or return an empty list when none of its sets has songs."""
+    structured_sets: List[Tuple[Optional[str], Sequence[str]]] = []
+
+    for raw_set in setlist.set:
+        songs = [song.name for song in raw_set.song if song.name]
+        if songs:
+            structured_sets.append((raw_set.name, songs))
 
-    if limit > 0:
-        rows = rows[:limit]
+    if not structured_sets:
+        return []
 
-    name_width = max(len("Name"), *(len(name) for name, _ in rows))
-    url_width = max(len("URL"), *(len(url) for _, url in rows))
+    event_date = setlist.event_date or "Unknown date"
+    venue = (setlist.venue.name if setlist.venue else "") or "Unknown venue"
+    city = setlist.venue.city.name if setlist.venue and setlist.venue.city else ""
+    location = f"{venue} ({city})" if city else venue
+    tour = setlist.tour.name if setlist.tour else ""
+    url = setlist.url
 
-    header = f"| {'Name'.ljust(name_width)} | {'URL'.ljust(url_width)} |"
-    separator = f"| {'-' * name_width} | {'-' * url_width} |"
-    body = [
-        f"| {name.ljust(name_width)} | {url.ljust(url_width)} |"
-        for name, url in rows
+    lines = [f"🎤 {event_date} · {location}"]
+    if tour:
+        lines.append(f"Tour: {tour}")
+    if url:
+        lines.append(f"Link: {url}")
+
+    for idx, (set_name, songs) in enumerate(structured_sets, start=1):
+        title = set_name or ("Encore" if idx > 1 else "Set")
+        lines.append("")
+        lines.append(f"{title}:")
+        for song_idx, song_name in enumerate(songs, start=1):
+            lines.append(f"  {song_idx}. {song_name}")
+
+    return lines
+
+
+def _analytics_lines(analytics: SetlistAnalytics, top: int = 10) -> List[str]:
+    if not analytics.shows:
+        return []
+
+    def ranked(pairs: Sequence[Tuple[str, int]]) -> str:
+        return ", ".join(f"{name} ({count})" for name, count in pairs)
+
+    lines = [
+        f"📊 {analytics.shows} shows · {analytics.average_length:.1f} songs on average"
+        f" (min {analytics.min_length}, max {analytics.max_length})",
+        "",
+        "Most played:",
+        *(f"  {idx}. {name} ({count})" for idx, (name, count) in enumerate(analytics.top_songs(top), start=1)),
+        "",
+        f"Openers: {ranked(analytics.top_openers())}",
+        f"Closers: {ranked(analytics.top_closers())}",
     ]
+    if analytics.shows_with_encore:
+        average = analytics.encore_songs / analytics.shows_with_encore
+        lines.append(
+            f"Encores: {analytics.shows_with_encore}/{analytics.shows} shows, {average:.1f} songs on average"
+            f" · {ranked(analytics.top_encore_songs())}"
+        )
+    else:
+        lines.append("Encores: none")
+    return lines
 
-    return "\n".join([header, separator, *body])
 
+def render_artist_table(raw_payload: Payload, limit: int = 5) -> str:
+    try:
+        payload = decode(raw_payload, Artists)
+    except ValueError:
+        return _as_text(raw_payload)
 
-def render_setlist(raw_payload: str) -> str:
+    return "\n".join(_table_lines(_artist_rows(payload.artist, limit)))
+
+
+def render_setlist(raw_payload: Payload) -> str:
     try:
-        payload = json.loads(raw_payload)
-    except json.JSONDecodeError:
-        return raw_payload
-
-    setlists = payload.get("setlist") or []
-    for setlist in setlists:
-        raw_sets = setlist.get("sets", {}).get("set") or []
-        structured_sets: List[Tuple[Optional[str], Sequence[str]]] = []
-
-        for raw_set in raw_sets:
-            songs = [
-                str(song.get("name", "")).strip()
-                for song in (raw_set.get("song") or [])
-                if str(song.get("name", "")).strip()
-            ]
-            if songs:
-                structured_sets.append((raw_set.get("name"), songs))
-
-        if not structured_sets:
-            continue
-
-        event_date = setlist.get("eventDate") or "Unknown date"
-        venue = setlist.get("venue", {}).get("name") or "Unknown venue"
-        city = setlist.get("venue", {}).get("city", {}).get("name") or ""
-        location = f"{venue} ({city})" if city else venue
-        tour = setlist.get("tour", {}).get("name")
-        url = setlist.get("url")
-
-        lines = [f"🎤 {event_date} · {location}"]
-        if tour:
-            lines.append(f"Tour: {tour}")
-        if url:
-            lines.append(f"Link: {url}")
-
-        for idx, (set_name, songs) in enumerate(structured_sets, start=1):
-            title = set_name or ("Encore" if idx > 1 else "Set")
-            lines.append("")
-            lines.append(f"{title}:")
-            for song_idx, song_name in enumerate(songs, start=1):
-                lines.append(f"  {song_idx}. {song_name}")
-
-        return "\n".join(lines)
+        payload = decode(raw_payload, Setlists)
+    except ValueError:
+        return _as_text(raw_payload)
+
+    for setlist in payload.setlist:
+        lines = _setlist_lines(setlist)
+        if lines:
+            return "\n".join(lines)
 
     return "(no setlists with songs found)"
+
+
+def render_setlists(raw_payload: Payload, top: int = 10) -> str:
+    """Render every show of the page followed by song and show aggregates."""
+    try:
+        payload = decode(raw_payload, Setlists)
+    except ValueError:
+        return _as_text(raw_payload)
+
+    analytics = SetlistAnalytics()
+    blocks = []
+    for setlist in payload.setlist:
+        lines = _setlist_lines(setlist)
+        if lines:
+            analytics.add(setlist)
+            blocks.append("\n".join(lines))
+
+    if not blocks:
+        return "(no setlists with songs found)"
+
+    summary = _analytics_lines(analytics, top)
+    if summary:
+        blocks.append("\n".join(summary))
+    return "\n\n".join(blocks)
+
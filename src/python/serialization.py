@@ -0,0 +1,112 @@
+"""JSON encoding and decoding shared by the server, middleware and clients.
+
+The stdlib ``json`` module is used everywhere by default. Installing
+``orjson`` or ``msgspec`` switches every module to the faster backend without
+code changes; ``JSON_BACKEND`` (``auto``, ``orjson``, ``msgspec`` or ``json``)
+forces a choice, e.g. to compare them with ``python benchmarks.py json``.
+
+All backends produce compact UTF-8 output (no ``\\uXXXX`` escaping) and raise
+a ``ValueError`` subclass on malformed input.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+JSONInput = Union[str, bytes, bytearray, memoryview]
+
+
+class _Backend:
+    """``loads``/``dumpb`` pair of one JSON library."""
+
+    name = "json"
+
+    def loads(self, data: JSONInput) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+    def dumpb(self, obj: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default, sort_keys=sort_keys).encode()
+
+
+class _OrjsonBackend(_Backend):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self.loads = orjson.loads  # type: ignore[method-assign]
+        self._options = orjson.OPT_NON_STR_KEYS
+        self._sorted_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+    def dumpb(self, obj: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> bytes:
+        return self._orjson.dumps(obj, default=default, option=self._sorted_options if sort_keys else self._options)
+
+
+class _MsgspecBackend(_Backend):
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+        self._sorted_encoder = msgspec.json.Encoder(order="sorted")
+
+    def loads(self, data: JSONInput) -> Any:
+        return self._decoder.decode(data)
+
+    def dumpb(self, obj: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> bytes:
+        if default is not None:
+            return self._msgspec.json.encode(obj, enc_hook=default, order="sorted" if sort_keys else None)
+        return (self._sorted_encoder if sort_keys else self._encoder).encode(obj)
+
+
+_BACKENDS: Dict[str, Callable[[], _Backend]] = {
+    "orjson": _OrjsonBackend,
+    "msgspec": _MsgspecBackend,
+    "json": _Backend,
+}
+
+
+def get_backend(name: str = JSON_BACKEND) -> _Backend:
+    """Return the requested backend, or the fastest installed one for ``auto``."""
+    candidates = list(_BACKENDS) if name == "auto" else [name]
+    for candidate in candidates:
+        factory = _BACKENDS.get(candidate)
+        if factory is None:
+            raise ValueError(f"Unknown JSON backend '{candidate}'. Use one of: auto, {', '.join(_BACKENDS)}.")
+        try:
+            return factory()
+        except ImportError:
+            if name != "auto":
+                logger.warning("JSON backend %s is not installed, using the stdlib json module", candidate)
+    return _Backend()
+
+
+backend = get_backend()
+
+
+def loads(data: JSONInput) -> Any:
+    """Decode a JSON document from ``str`` or UTF-8 ``bytes``."""
+    return backend.loads(data)
+
+
+def dumpb(obj: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON bytes."""
+    return backend.dumpb(obj, default=default, sort_keys=sort_keys)
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None, sort_keys: bool = False) -> str:
+    """Encode ``obj`` as a compact JSON string."""
+    return backend.dumpb(obj, default=default, sort_keys=sort_keys).decode()
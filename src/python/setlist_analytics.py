@@ -0,0 +1,152 @@
+"""Single-pass aggregates over setlist.fm shows.
+
+Song titles are mapped to small integer ids once (the models already intern
+the strings) and every counter is an ``array('I')`` indexed by that id, so
+memory grows with the number of distinct songs, not with the number of shows;
+show lengths are kept as a histogram for the same reason.
+Tape songs (intros, outros played from tape) are left out of the counts.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from heapq import nlargest
+from typing import Iterable, List, Tuple
+
+from setlistfm_models import Setlist
+
+
+@dataclass(slots=True)
+class ShowStats:
+    """Per-show figures computed while a setlist is added."""
+
+    setlist_id: str
+    event_date: str
+    songs: int
+    encore_songs: int
+    opener: str
+    closer: str
+
+
+class SetlistAnalytics:
+    """Accumulates song frequencies, show lengths, openers/closers and encores."""
+
+    def __init__(self) -> None:
+        self._song_ids: dict[str, int] = {}
+        self._song_names: List[str] = []
+        self.song_counts = array("I")
+        self.opener_counts = array("I")
+        self.closer_counts = array("I")
+        self.encore_counts = array("I")
+        self.length_counts = array("I")
+        self.shows = 0
+        self.total_songs = 0
+        self.shows_with_encore = 0
+        self.encore_songs = 0
+
+    def song_id(self, name: str) -> int:
+        song_id = self._song_ids.get(name)
+        if song_id is None:
+            song_id = self._song_ids[name] = len(self._song_names)
+            self._song_names.append(name)
+            for counter in (self.song_counts, self.opener_counts, self.closer_counts, self.encore_counts):
+                counter.append(0)
+        return song_id
+
+    def song_name(self, song_id: int) -> str:
+        return self._song_names[song_id]
+
+    def add(self, setlist: Setlist) -> ShowStats | None:
+        """Count one show; shows without any performed song are ignored."""
+        first = last = -1
+        songs = encore_songs = 0
+        for song_set in setlist.set:
+            for song in song_set.song:
+                if not song.name or song.tape:
+                    continue
+                song_id = self.song_id(song.name)
+                self.song_counts[song_id] += 1
+                if song_set.encore:
+                    self.encore_counts[song_id] += 1
+                    encore_songs += 1
+                if first < 0:
+                    first = song_id
+                last = song_id
+                songs += 1
+
+        if not songs:
+            return None
+
+        self.shows += 1
+        self.total_songs += songs
+        if songs >= len(self.length_counts):
+            self.length_counts.extend([0] * (songs + 1 - len(self.length_counts)))
+        self.length_counts[songs] += 1
+        self.opener_counts[first] += 1
+        self.closer_counts[last] += 1
+        if encore_songs:
+            self.shows_with_encore += 1
+            self.encore_songs += encore_songs
+
+        return ShowStats(
+            setlist_id=setlist.id,
+            event_date=setlist.event_date,
+            songs=songs,
+            encore_songs=encore_songs,
+            opener=self._song_names[first],
+            closer=self._song_names[last],
+        )
+
+    def add_all(self, setlists: Iterable[Setlist]) -> SetlistAnalytics:
+        for setlist in setlists:
+            self.add(setlist)
+        return self
+
+    def _top(self, counter: array, n: int) -> List[Tuple[str, int]]:
+        ranked = nlargest(n, (pair for pair in enumerate(counter) if pair[1]), key=lambda pair: pair[1])
+        return [(self._song_names[song_id], count) for song_id, count in ranked]
+
+    def top_songs(self, n: int = 10) -> List[Tuple[str, int]]:
+        return self._top(self.song_counts, n)
+
+    def top_openers(self, n: int = 3) -> List[Tuple[str, int]]:
+        return self._top(self.opener_counts, n)
+
+    def top_closers(self, n: int = 3) -> List[Tuple[str, int]]:
+        return self._top(self.closer_counts, n)
+
+    def top_encore_songs(self, n: int = 3) -> List[Tuple[str, int]]:
+        return self._top(self.encore_counts, n)
+
+    @property
+    def average_length(self) -> float:
+        return self.total_songs / self.shows if self.shows else 0.0
+
+    @property
+    def min_length(self) -> int:
+        return next((length for length, count in enumerate(self.length_counts) if count), 0)
+
+    @property
+    def max_length(self) -> int:
+        return len(self.length_counts) - 1 if self.shows else 0
+
+    def summary(self, top: int = 10) -> dict:
+        """Aggregates as plain JSON-compatible data."""
+        return {
+            "shows": self.shows,
+            "distinct_songs": len(self._song_names),
+            "show_length": {
+                "average": round(self.average_length, 2),
+                "min": self.min_length,
+                "max": self.max_length,
+            },
+            "top_songs": self.top_songs(top),
+            "openers": self.top_openers(),
+            "closers": self.top_closers(),
+            "encores": {
+                "shows_with_encore": self.shows_with_encore,
+                "average_songs": round(self.encore_songs / self.shows_with_encore, 2) if self.shows_with_encore else 0.0,
+                "top_songs": self.top_encore_songs(),
+            },
+        }
@@ -0,0 +1,346 @@
+"""Local mirror of the setlists of watched artists.
+
+For the artists listed in ``WATCHED_ARTISTS`` (comma-separated MBIDs) the
+server keeps every setlist in SQLite (``SETLISTFM_DATA_DIR/setlists.db``):
+
+- ``SetlistMirror`` syncs each artist every ``MIRROR_SYNC_INTERVAL`` seconds
+  by walking ``/artist/{mbid}/setlists`` newest-first and stopping at the
+  first page whose setlists are all stored with the same ``lastUpdated``.
+  A first sync is capped at ``MIRROR_SYNC_MAX_PAGES`` pages; the next runs
+  resume the backfill where it stopped. Pages are fetched with the server's
+  client, whose ``RateLimitTransport`` (``rate_limit.py``) spaces them with
+  every other upstream request of the server.
+  Edits to setlists older than the first unchanged page are not seen by the
+  incremental walk; deleting an artist's ``sync_state`` row forces a full one.
+- ``SetlistMirrorMiddleware`` answers ``getArtistSetlists`` (and
+  ``getSetlists``/``searchForSetlists`` filtered on the MBID only) for
+  mirrored artists from the store, without upstream quota. The result
+  ``_meta.mirror`` tells how old the data is.
+- ``staleness()`` (also the ``/mirror/status`` route and the
+  ``setlist_mirror.staleness`` gauge) reports per artist the age of the last
+  successful sync, the number of stored setlists and the last error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools.tool import ToolResult
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from artist_index import DATA_DIR
+from serialization import dumps, loads
+from structured_content import text_content
+
+logger = logging.getLogger(__name__)
+
+MIRROR_PATH = Path(os.getenv("SETLIST_MIRROR_PATH", DATA_DIR / "setlists.db"))
+WATCHED_ARTISTS = [mbid.strip() for mbid in os.getenv("WATCHED_ARTISTS", "").split(",") if mbid.strip()]
+SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", 6 * 3600))
+SYNC_MAX_PAGES = int(os.getenv("MIRROR_SYNC_MAX_PAGES", "50"))
+PAGE_SIZE = 20
+
+PageFetcher = Callable[[str, int], Awaitable[Dict[str, Any]]]
+
+meter = metrics.get_meter("setlist_mirror")
+served = meter.create_counter("setlist_mirror.served", description="Setlist pages served from the local mirror")
+synced = meter.create_counter("setlist_mirror.synced", description="Setlists added or updated by the mirror sync")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS setlists (
+    id TEXT PRIMARY KEY,
+    artist_mbid TEXT NOT NULL,
+    event_date TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS setlists_artist_date ON setlists(artist_mbid, event_date DESC, id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    artist_mbid TEXT PRIMARY KEY,
+    name TEXT,
+    last_sync REAL,
+    upstream_total INTEGER,
+    complete INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+"""
+
+
+def iso_date(event_date: str) -> str:
+    """``dd-MM-yyyy`` (setlist.fm) to ``yyyy-MM-dd`` so dates sort as text."""
+    day, month, year = (event_date.split("-") + ["", "", ""])[:3]
+    return f"{year}-{month}-{day}" if year else event_date
+
+
+class SetlistStore:
+    """SQLite store of mirrored setlists and per-artist sync state."""
+
+    def __init__(self, path: Path = MIRROR_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def known(self, ids: Iterable[str]) -> Dict[str, str]:
+        """``{id: lastUpdated}`` of the stored setlists among ``ids``."""
+        ids = list(ids)
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            return dict(self._db.execute(f"SELECT id, last_updated FROM setlists WHERE id IN ({placeholders})", ids))
+
+    def upsert(self, artist_mbid: str, setlists: List[Dict[str, Any]]) -> None:
+        rows = [
+            (item["id"], artist_mbid, iso_date(item.get("eventDate", "")), item.get("lastUpdated", ""), dumps(item))
+            for item in setlists
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO setlists (id, artist_mbid, event_date, last_updated, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET event_date = excluded.event_date, "
+                "last_updated = excluded.last_updated, data = excluded.data",
+                rows,
+            )
+
+    def count(self, artist_mbid: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM setlists WHERE artist_mbid = ?", (artist_mbid,)).fetchone()[0]
+
+    def page(self, artist_mbid: str, page: int, size: int = PAGE_SIZE) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of an artist's setlists, newest first, and the stored total."""
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM setlists WHERE artist_mbid = ?", (artist_mbid,)).fetchone()[0]
+            rows = self._db.execute(
+                "SELECT data FROM setlists WHERE artist_mbid = ? ORDER BY event_date DESC, id LIMIT ? OFFSET ?",
+                (artist_mbid, size, (page - 1) * size),
+            ).fetchall()
+        return [loads(data) for (data,) in rows], total
+
+    def state(self, artist_mbid: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, last_sync, upstream_total, complete, last_error FROM sync_state WHERE artist_mbid = ?",
+                (artist_mbid,),
+            ).fetchone()
+        keys = ("name", "last_sync", "upstream_total", "complete", "last_error")
+        return dict(zip(keys, row)) if row else dict.fromkeys(keys)
+
+    def save_state(self, artist_mbid: str, **values: Any) -> None:
+        state = {**self.state(artist_mbid), **values}
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (artist_mbid, name, last_sync, upstream_total, complete, last_error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (artist_mbid, state["name"], state["last_sync"], state["upstream_total"], int(state["complete"] or 0), state["last_error"]),
+            )
+
+
+class SetlistMirror:
+    """Keeps the store in sync with setlist.fm for the watched artists."""
+
+    def __init__(
+        self,
+        fetch_page: PageFetcher,
+        store: Optional[SetlistStore] = None,
+        artists: Iterable[str] = WATCHED_ARTISTS,
+        interval: float = SYNC_INTERVAL,
+        max_pages: int = SYNC_MAX_PAGES,
+    ):
+        """
+        Args:
+            fetch_page: Coroutine returning the ``/artist/{mbid}/setlists`` document of a page
+            store: Setlist store, ``SETLIST_MIRROR_PATH`` by default
+            artists: MBIDs of the watched artists
+            interval: Seconds between two syncs of an artist
+            max_pages: Upstream pages fetched per artist and sync at most
+        """
+        self._fetch_page = fetch_page
+        self.store = store if store is not None else SetlistStore()
+        self.artists = list(dict.fromkeys(artists))
+        self.interval = interval
+        self.max_pages = max_pages
+        self._task: Optional[asyncio.Task] = None
+        meter.create_observable_gauge(
+            "setlist_mirror.staleness",
+            callbacks=[self._observe_staleness],
+            unit="s",
+            description="Seconds since the last successful sync of a watched artist",
+        )
+
+    @classmethod
+    def from_http(cls, client: httpx.AsyncClient, **kwargs: Any) -> SetlistMirror:
+        """Mirror fetching pages with the server's setlist.fm client."""
+
+        async def fetch_page(mbid: str, page: int) -> Dict[str, Any]:
+            response = await client.get(f"/1.0/artist/{mbid}/setlists", params={"p": page})
+            if response.status_code == 404:
+                # setlist.fm answers 404 past the last page or for artists without setlists.
+                return {"setlist": [], "total": 0}
+            response.raise_for_status()
+            return loads(response.content)
+
+        return cls(fetch_page, **kwargs)
+
+    def is_mirrored(self, artist_mbid: str) -> bool:
+        """True once the whole history of a watched artist is stored, not while its backfill runs."""
+        if artist_mbid not in self.artists:
+            return False
+        state = self.store.state(artist_mbid)
+        return state["last_sync"] is not None and bool(state["complete"])
+
+    async def fetch_page(self, mbid: str, page: int) -> Dict[str, Any]:
+        """One ``/artist/{mbid}/setlists`` page, from the store for mirrored artists."""
+        if not await asyncio.to_thread(self.is_mirrored, mbid):
+            return await self._fetch_page(mbid, page)
+        items, total = await asyncio.to_thread(self.store.page, mbid, page)
+        return {"type": "setlists", "itemsPerPage": PAGE_SIZE, "page": page, "total": total, "setlist": items}
+
+    async def _walk(self, mbid: str, first_page: int, stop_when_known: bool) -> Tuple[int, int, Optional[bool]]:
+        """Fetch pages from ``first_page``; return (pages fetched, setlists changed, reached the end)."""
+        changed = 0
+        pages = 0
+        page = first_page
+        while pages < self.max_pages:
+            document = await self._fetch_page(mbid, page)
+            pages += 1
+            items = [item for item in document.get("setlist") or [] if item.get("id")]
+            if document.get("total") is not None:
+                await asyncio.to_thread(self.store.save_state, mbid, upstream_total=document["total"])
+            if not items:
+                return pages, changed, True
+            known = await asyncio.to_thread(self.store.known, (item["id"] for item in items))
+            fresh = [item for item in items if known.get(item["id"]) != item.get("lastUpdated")]
+            if fresh:
+                await asyncio.to_thread(self.store.upsert, mbid, fresh)
+                changed += len(fresh)
+                if not (await asyncio.to_thread(self.store.state, mbid))["name"]:
+                    await asyncio.to_thread(self.store.save_state, mbid, name=fresh[0].get("artist", {}).get("name"))
+            if page * int(document.get("itemsPerPage") or PAGE_SIZE) >= int(document.get("total") or 0):
+                return pages, changed, True
+            if stop_when_known and not fresh:
+                return pages, changed, None
+            page += 1
+        return pages, changed, False
+
+    async def sync_artist(self, mbid: str) -> int:
+        """Bring one artist up to date; returns the number of setlists added or updated."""
+        start = time.perf_counter()
+        state = await asyncio.to_thread(self.store.state, mbid)
+        try:
+            # Newest first, stopping at the first page that is already mirrored.
+            pages, changed, reached_end = await self._walk(mbid, 1, stop_when_known=bool(state["last_sync"]))
+            complete = bool(state["complete"]) or bool(reached_end)
+            if not complete and reached_end is None:
+                # An earlier sync hit the page cap: resume the backfill after the stored setlists.
+                resume = await asyncio.to_thread(self.store.count, mbid) // PAGE_SIZE + 1
+                more_pages, more_changed, reached_end = await self._walk(mbid, resume, stop_when_known=False)
+                pages, changed, complete = pages + more_pages, changed + more_changed, bool(reached_end)
+        except Exception as exc:
+            logger.warning("Mirror sync of %s failed: %s", mbid, exc)
+            await asyncio.to_thread(self.store.save_state, mbid, last_error=str(exc))
+            raise
+        await asyncio.to_thread(self.store.save_state, mbid, last_sync=time.time(), complete=complete, last_error=None)
+        synced.add(changed, {"artist.mbid": mbid})
+        logger.info(
+            "Mirrored %s: %d setlists changed, %d pages fetched in %.1fs%s",
+            mbid, changed, pages, time.perf_counter() - start, "" if complete else " (backfill pending)",
+        )
+        return changed
+
+    async def sync_all(self) -> None:
+        for mbid in self.artists:
+            state = await asyncio.to_thread(self.store.state, mbid)
+            if state["last_sync"] and time.time() - state["last_sync"] < self.interval:
+                continue
+            try:
+                await self.sync_artist(mbid)
+            except Exception:
+                continue
+
+    async def run_forever(self) -> None:
+        while True:
+            await self.sync_all()
+            await asyncio.sleep(min(self.interval, 300))
+
+    @asynccontextmanager
+    async def lifespan(self, _server: Any) -> AsyncIterator[None]:
+        """FastMCP lifespan running the periodic sync while the server is up."""
+        if self.artists:
+            self._task = asyncio.create_task(self.run_forever(), name="setlist-mirror-sync")
+        try:
+            yield
+        finally:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def staleness(self) -> Dict[str, Dict[str, Any]]:
+        """Per-artist sync status: age of the last sync, stored and upstream counts, last error."""
+        return {mbid: self.status(mbid) for mbid in self.artists}
+
+    def status(self, mbid: str) -> Dict[str, Any]:
+        """Sync status of one watched artist, see ``staleness``; blocking, run it in a thread."""
+        now = time.time()
+        state = self.store.state(mbid)
+        return {
+            "name": state["name"],
+            "age_seconds": round(now - state["last_sync"]) if state["last_sync"] else None,
+            "stale": not state["last_sync"] or now - state["last_sync"] > self.interval,
+            "setlists": self.store.count(mbid),
+            "upstream_total": state["upstream_total"],
+            "complete": bool(state["complete"]),
+            "last_error": state["last_error"],
+        }
+
+    def _observe_staleness(self, _options: CallbackOptions) -> Iterable[Observation]:
+        now = time.time()
+        for mbid in self.artists:
+            last_sync = self.store.state(mbid)["last_sync"]
+            if last_sync:
+                yield Observation(now - last_sync, {"artist.mbid": mbid})
+
+
+class SetlistMirrorMiddleware(Middleware):
+    """Serve setlist pages of mirrored artists from the local store."""
+
+    # Tool name -> argument holding the artist MBID.
+    TOOLS = {"getArtistSetlists": "mbid", "getSetlists": "artistMbid", "searchForSetlists": "artistMbid"}
+
+    def __init__(self, mirror: SetlistMirror):
+        self.mirror = mirror
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = getattr(context.message, "name", "")
+        arguments = getattr(context.message, "arguments", None) or {}
+        key = self.TOOLS.get(tool)
+        # Only the artist filter and the page number can be answered locally.
+        if key is None or set(arguments) - {key, "p"}:
+            return await call_next(context)
+        try:
+            page = max(int(arguments.get("p") or 1), 1)
+        except (TypeError, ValueError):
+            return await call_next(context)
+        mbid = str(arguments.get(key))
+        if not await asyncio.to_thread(self.mirror.is_mirrored, mbid):
+            return await call_next(context)
+
+        items, total = await asyncio.to_thread(self.mirror.store.page, mbid, page)
+        served.add(1, {"artist.mbid": mbid})
+        structured = {"type": "setlists", "itemsPerPage": PAGE_SIZE, "page": page, "total": total, "setlist": items}
+        meta = {"mirror": await asyncio.to_thread(self.mirror.status, mbid)}
+        return ToolResult(content=text_content(structured), structured_content=structured, meta=meta)
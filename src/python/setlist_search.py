@@ -0,0 +1,200 @@
+"""Full-text search over the locally mirrored setlists.
+
+setlist.fm cannot answer "which shows included song X": ``getSetlists`` only
+filters on artist, venue, city and date, so an agent has to page through every
+setlist of an artist and read them. ``SearchableSetlistStore`` adds an SQLite
+FTS5 index to the mirror store (``setlist_mirror.py``):
+
+- one FTS row per setlist with the artist name, the song titles (one per
+  line), the venue, the city and the country, kept in sync with the
+  ``setlists`` table by triggers, so the mirror sync needs no change;
+- ``search`` ranks matches with BM25, song titles weighing the most, and
+  filters on artist MBID, country code and event date range in the same query;
+- every matching setlist comes back with the songs that matched, so the agent
+  does not need a ``getSetlist`` call to check the hit.
+
+Only mirrored artists (``WATCHED_ARTISTS``) are searchable.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from opentelemetry import metrics
+
+from artist_index import normalize
+from serialization import loads
+from setlist_mirror import MIRROR_PATH, SetlistStore, iso_date
+
+SEARCH_LIMIT = 25
+
+meter = metrics.get_meter("setlist_search")
+search_duration = meter.create_histogram(
+    "setlist_search.duration", unit="ms", description="Duration of full-text setlist searches"
+)
+
+# Column expressions over a ``setlists`` row, shared by the triggers and the rebuild.
+_FTS_VALUES = """
+    json_extract({row}.data, '$.artist.name'),
+    (SELECT group_concat(json_extract(song.value, '$.name'), char(10))
+       FROM json_each({row}.data, '$.sets.set') AS part, json_each(part.value, '$.song') AS song),
+    json_extract({row}.data, '$.venue.name'),
+    json_extract({row}.data, '$.venue.city.name'),
+    json_extract({row}.data, '$.venue.city.country.name'),
+    json_extract({row}.data, '$.venue.city.country.code')
+"""
+
+_FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS setlist_fts USING fts5(
+    artist, songs, venue, city, country, country_code UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS setlists_fts_insert AFTER INSERT ON setlists BEGIN
+    INSERT INTO setlist_fts (rowid, artist, songs, venue, city, country, country_code)
+    VALUES (new.rowid, {_FTS_VALUES.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS setlists_fts_update AFTER UPDATE ON setlists BEGIN
+    DELETE FROM setlist_fts WHERE rowid = old.rowid;
+    INSERT INTO setlist_fts (rowid, artist, songs, venue, city, country, country_code)
+    VALUES (new.rowid, {_FTS_VALUES.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS setlists_fts_delete AFTER DELETE ON setlists BEGIN
+    DELETE FROM setlist_fts WHERE rowid = old.rowid;
+END;
+"""
+
+_REBUILD = f"""
+INSERT INTO setlist_fts (rowid, artist, songs, venue, city, country, country_code)
+SELECT s.rowid, {_FTS_VALUES.format(row="s")} FROM setlists AS s
+"""
+
+# bm25() weights, in column order: artist, songs, venue, city, country.
+_WEIGHTS = (2.0, 10.0, 5.0, 3.0, 1.0)
+
+_DATE = re.compile(r"^\d{2}-\d{2}-\d{4}$")
+
+
+def phrase(text: str) -> str:
+    """``text`` as an FTS5 phrase, the last word matching as a prefix."""
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return ""
+    return " + ".join(f'"{word}"' for word in words) + "*"
+
+
+def _date_bound(value: Optional[str]) -> Optional[str]:
+    """Accept ``yyyy-MM-dd``, ``yyyy`` or setlist.fm's ``dd-MM-yyyy``."""
+    if not value:
+        return None
+    return iso_date(value) if _DATE.match(value) else value
+
+
+class SearchableSetlistStore(SetlistStore):
+    """Setlist store with an FTS5 index on songs, venues, cities and artists."""
+
+    def __init__(self, path: Path = MIRROR_PATH):
+        super().__init__(path)
+        with self._lock, self._db:
+            created = not self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'setlist_fts'").fetchone()
+            self._db.executescript(_FTS_SCHEMA)
+            if created:
+                # Setlists mirrored before the index existed.
+                self._db.execute(_REBUILD)
+
+    def search(
+        self,
+        song: Optional[str] = None,
+        venue: Optional[str] = None,
+        city: Optional[str] = None,
+        text: Optional[str] = None,
+        artist_mbid: Optional[str] = None,
+        country_code: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = SEARCH_LIMIT,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Matching setlists, best first, and the total number of matches.
+
+        Args:
+            song: Song title, matched as a phrase in the song list
+            venue: Venue name phrase
+            city: City name phrase
+            text: Phrase matched in any column
+            artist_mbid: Restrict to one artist
+            country_code: ISO country code of the venue, e.g. ``GB``
+            date_from: First event date (``yyyy-MM-dd``), inclusive
+            date_to: Last event date (``yyyy-MM-dd``), inclusive
+            limit: Maximum number of setlists returned
+
+        Returns:
+            Hits with the setlist summary and matched songs, and the match count
+        """
+        fields = ",".join(name for name, value in (("song", song), ("venue", venue), ("city", city), ("text", text)) if value)
+        terms = [
+            f"{column} : {phrase(value)}"
+            for column, value in (("songs", song), ("venue", venue), ("city", city))
+            if value and phrase(value)
+        ]
+        if text and phrase(text):
+            terms.append(phrase(text))
+        if not terms:
+            raise ValueError("At least one of song, venue, city or text is required")
+
+        filters = ["setlist_fts MATCH ?"]
+        params: List[Any] = [" AND ".join(terms)]
+        if artist_mbid:
+            filters.append("s.artist_mbid = ?")
+            params.append(artist_mbid)
+        if country_code:
+            filters.append("setlist_fts.country_code = ?")
+            params.append(country_code.upper())
+        if _date_bound(date_from):
+            filters.append("s.event_date >= ?")
+            params.append(_date_bound(date_from))
+        if _date_bound(date_to):
+            # A bare year or month bound includes the whole period.
+            filters.append("s.event_date <= ?")
+            params.append(_date_bound(date_to) + "\uffff")
+        where = " AND ".join(filters)
+
+        start = time.perf_counter()
+        with self._lock:
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM setlist_fts JOIN setlists AS s ON s.rowid = setlist_fts.rowid WHERE {where}", params
+            ).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT s.data, bm25(setlist_fts, {', '.join(map(str, _WEIGHTS))}) AS score "
+                f"FROM setlist_fts JOIN setlists AS s ON s.rowid = setlist_fts.rowid WHERE {where} "
+                "ORDER BY score, s.event_date DESC LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        search_duration.record((time.perf_counter() - start) * 1000, {"search.fields": fields})
+        return [self._hit(loads(data), -score, song or text) for data, score in rows], total
+
+    @staticmethod
+    def _hit(setlist: Dict[str, Any], score: float, song: Optional[str]) -> Dict[str, Any]:
+        venue = setlist.get("venue") or {}
+        city = venue.get("city") or {}
+        songs = [
+            item.get("name", "")
+            for part in (setlist.get("sets") or {}).get("set") or []
+            for item in part.get("song") or []
+        ]
+        wanted = normalize(song) if song else ""
+        return {
+            "id": setlist.get("id"),
+            "eventDate": setlist.get("eventDate"),
+            "artist": (setlist.get("artist") or {}).get("name"),
+            "artistMbid": (setlist.get("artist") or {}).get("mbid"),
+            "venue": venue.get("name"),
+            "city": city.get("name"),
+            "country": (city.get("country") or {}).get("code"),
+            "tour": (setlist.get("tour") or {}).get("name"),
+            "url": setlist.get("url"),
+            "score": round(score, 3),
+            "songCount": len(songs),
+            "matchedSongs": [name for name in songs if wanted and wanted in normalize(name)],
+        }
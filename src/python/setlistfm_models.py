@@ -0,0 +1,452 @@
+"""Typed setlist.fm models generated from src/apim/setlistfm/swagger.json.
+
+Do not edit by hand: run ``python gen_setlistfm_models.py`` to regenerate.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from serialization import loads
+
+try:
+    import msgspec
+except ImportError:  # every payload goes through loads() and from_json()
+    msgspec = None
+
+T = TypeVar("T")
+
+_intern = sys.intern
+
+if msgspec is not None:
+    # Decoded values form trees without cycles: no need for GC tracking.
+    class _Model(msgspec.Struct, gc=False):
+        pass
+
+    def _model(cls: type[T]) -> type[T]:
+        return cls
+
+else:
+
+    class _Model:
+        __slots__ = ()
+
+        def __init_subclass__(cls, **options: Any) -> None:
+            # Accepts the msgspec.Struct options (rename=...) of the class statements.
+            super().__init_subclass__()
+
+    _model = dataclass(slots=True)
+
+_decoders: dict[type, Any] = {}
+
+
+def _str(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return str(value).strip()
+
+
+def _istr(value: Any) -> str:
+    return _intern(_str(value))
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _nested(payload: dict[str, Any], outer: str, inner: str) -> Any:
+    wrapper = payload.get(outer)
+    if isinstance(wrapper, dict):
+        return wrapper.get(inner)
+    return payload.get(inner)
+
+
+def decode(data: bytes | str | dict[str, Any], model: type[T]) -> T:
+    """Decode a raw JSON payload (or an already parsed dict) into ``model``.
+
+    Raw payloads are decoded by a typed ``msgspec`` decoder when installed;
+    one it rejects (a ``null`` field, an unexpected type) and dicts are walked
+    by ``model.from_json``, which tolerates them. Only ``from_json`` strips
+    and interns strings: doing it in ``__post_init__`` would cost more than
+    the typed decode itself.
+    """
+    if msgspec is not None and isinstance(data, (bytes, bytearray, str)):
+        decoder = _decoders.get(model)
+        if decoder is None:
+            decoder = _decoders[model] = msgspec.json.Decoder(model, strict=False)
+        try:
+            return decoder.decode(data)
+        except msgspec.ValidationError:
+            pass
+    payload = loads(data) if isinstance(data, (bytes, bytearray, str)) else data
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object for {model.__name__}, got {type(payload).__name__}")
+    return model.from_json(payload)  # type: ignore[attr-defined]
+
+
+@_model
+class Artist(_Model, rename={"sort_name": "sortName"}):
+    """setlist.fm ``artist`` (swagger ``json_Artist``)."""
+
+    mbid: str = ""
+    tmid: int = 0
+    name: str = ""
+    sort_name: str = ""
+    disambiguation: str = ""
+    url: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Artist:
+        get = d.get
+        return cls(
+            v.strip() if (v := get("mbid")).__class__ is str else _str(v),
+            _int(get("tmid")),
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+            _intern(v.strip()) if (v := get("sortName")).__class__ is str else _istr(v),
+            _intern(v.strip()) if (v := get("disambiguation")).__class__ is str else _istr(v),
+            v.strip() if (v := get("url")).__class__ is str else _str(v),
+        )
+
+
+@_model
+class Artists(_Model, rename={"items_per_page": "itemsPerPage"}):
+    """setlist.fm ``artists`` (swagger ``json_Artists``)."""
+
+    artist: tuple[Artist, ...] = ()
+    total: int = 0
+    page: int = 0
+    items_per_page: int = 0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Artists:
+        get = d.get
+        return cls(
+            tuple(map(Artist.from_json, get("artist") or ())),
+            _int(get("total")),
+            _int(get("page")),
+            _int(get("itemsPerPage")),
+        )
+
+
+@_model
+class Coords(_Model):
+    """setlist.fm ``coords`` (swagger ``json_Coords``)."""
+
+    long: float = 0.0
+    lat: float = 0.0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Coords:
+        get = d.get
+        return cls(
+            _float(get("long")),
+            _float(get("lat")),
+        )
+
+
+@_model
+class Country(_Model):
+    """setlist.fm ``country`` (swagger ``json_Country``)."""
+
+    code: str = ""
+    name: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Country:
+        get = d.get
+        return cls(
+            _intern(v.strip()) if (v := get("code")).__class__ is str else _istr(v),
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+        )
+
+
+@_model
+class City(_Model, rename={"state_code": "stateCode"}):
+    """setlist.fm ``city`` (swagger ``json_City``)."""
+
+    id: str = ""
+    name: str = ""
+    state_code: str = ""
+    state: str = ""
+    coords: Coords | None = None
+    country: Country | None = None
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> City:
+        get = d.get
+        return cls(
+            v.strip() if (v := get("id")).__class__ is str else _str(v),
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+            _intern(v.strip()) if (v := get("stateCode")).__class__ is str else _istr(v),
+            _intern(v.strip()) if (v := get("state")).__class__ is str else _istr(v),
+            Coords.from_json(v) if (v := get("coords")) else None,
+            Country.from_json(v) if (v := get("country")) else None,
+        )
+
+
+@_model
+class Cities(_Model, rename={"items_per_page": "itemsPerPage"}):
+    """setlist.fm ``cities`` (swagger ``json_Cities``)."""
+
+    cities: tuple[City, ...] = ()
+    total: int = 0
+    page: int = 0
+    items_per_page: int = 0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Cities:
+        get = d.get
+        return cls(
+            tuple(map(City.from_json, get("cities") or ())),
+            _int(get("total")),
+            _int(get("page")),
+            _int(get("itemsPerPage")),
+        )
+
+
+@_model
+class Countries(_Model, rename={"items_per_page": "itemsPerPage"}):
+    """setlist.fm ``countries`` (swagger ``json_Countries``)."""
+
+    country: tuple[Country, ...] = ()
+    total: int = 0
+    page: int = 0
+    items_per_page: int = 0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Countries:
+        get = d.get
+        return cls(
+            tuple(map(Country.from_json, get("country") or ())),
+            _int(get("total")),
+            _int(get("page")),
+            _int(get("itemsPerPage")),
+        )
+
+
+@_model
+class Error(_Model):
+    """setlist.fm ``error`` (swagger ``json_Error``)."""
+
+    code: int = 0
+    status: str = ""
+    message: str = ""
+    timestamp: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Error:
+        get = d.get
+        return cls(
+            _int(get("code")),
+            v.strip() if (v := get("status")).__class__ is str else _str(v),
+            v.strip() if (v := get("message")).__class__ is str else _str(v),
+            v.strip() if (v := get("timestamp")).__class__ is str else _str(v),
+        )
+
+
+@_model
+class Song(_Model, rename={"with_": "with"}):
+    """setlist.fm ``song`` (swagger ``json_Song``)."""
+
+    name: str = ""
+    with_: Artist | None = None
+    cover: Artist | None = None
+    info: str = ""
+    tape: bool = False
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Song:
+        get = d.get
+        return cls(
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+            Artist.from_json(v) if (v := get("with")) else None,
+            Artist.from_json(v) if (v := get("cover")) else None,
+            v.strip() if (v := get("info")).__class__ is str else _str(v),
+            bool(get("tape")),
+        )
+
+
+@_model
+class Set(_Model):
+    """setlist.fm ``set`` (swagger ``json_Set``)."""
+
+    name: str = ""
+    encore: int = 0
+    song: tuple[Song, ...] = ()
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Set:
+        get = d.get
+        return cls(
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+            _int(get("encore")),
+            tuple(map(Song.from_json, get("song") or ())),
+        )
+
+
+@_model
+class Tour(_Model):
+    """setlist.fm ``tour`` (swagger ``json_Tour``)."""
+
+    name: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Tour:
+        get = d.get
+        return cls(
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+        )
+
+
+@_model
+class Venue(_Model):
+    """setlist.fm ``venue`` (swagger ``json_Venue``)."""
+
+    city: City | None = None
+    url: str = ""
+    id: str = ""
+    name: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Venue:
+        get = d.get
+        return cls(
+            City.from_json(v) if (v := get("city")) else None,
+            v.strip() if (v := get("url")).__class__ is str else _str(v),
+            v.strip() if (v := get("id")).__class__ is str else _str(v),
+            _intern(v.strip()) if (v := get("name")).__class__ is str else _istr(v),
+        )
+
+
+@_model
+class Sets(_Model):
+    """``sets`` wrapper of the ``set`` array of Setlist."""
+
+    set: tuple[Set, ...] = ()
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Sets:
+        get = d.get
+        return cls(tuple(map(Set.from_json, get("set") or ())))
+
+
+@_model
+class Setlist(_Model, rename={"version_id": "versionId", "last_fm_event_id": "lastFmEventId", "event_date": "eventDate", "last_updated": "lastUpdated"}):
+    """setlist.fm ``setlist`` (swagger ``json_Setlist``)."""
+
+    artist: Artist | None = None
+    venue: Venue | None = None
+    tour: Tour | None = None
+    sets: Sets | None = None
+    info: str = ""
+    url: str = ""
+    id: str = ""
+    version_id: str = ""
+    last_fm_event_id: int = 0
+    event_date: str = ""
+    last_updated: str = ""
+
+    @property
+    def set(self) -> tuple[Set, ...]:
+        return self.sets.set if self.sets is not None else ()
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Setlist:
+        get = d.get
+        return cls(
+            Artist.from_json(v) if (v := get("artist")) else None,
+            Venue.from_json(v) if (v := get("venue")) else None,
+            Tour.from_json(v) if (v := get("tour")) else None,
+            Sets(tuple(map(Set.from_json, _nested(d, "sets", "set") or ()))),
+            v.strip() if (v := get("info")).__class__ is str else _str(v),
+            v.strip() if (v := get("url")).__class__ is str else _str(v),
+            v.strip() if (v := get("id")).__class__ is str else _str(v),
+            v.strip() if (v := get("versionId")).__class__ is str else _str(v),
+            _int(get("lastFmEventId")),
+            v.strip() if (v := get("eventDate")).__class__ is str else _str(v),
+            v.strip() if (v := get("lastUpdated")).__class__ is str else _str(v),
+        )
+
+
+@_model
+class Setlists(_Model, rename={"items_per_page": "itemsPerPage"}):
+    """setlist.fm ``setlists`` (swagger ``json_Setlists``)."""
+
+    setlist: tuple[Setlist, ...] = ()
+    total: int = 0
+    page: int = 0
+    items_per_page: int = 0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Setlists:
+        get = d.get
+        return cls(
+            tuple(map(Setlist.from_json, get("setlist") or ())),
+            _int(get("total")),
+            _int(get("page")),
+            _int(get("itemsPerPage")),
+        )
+
+
+@_model
+class User(_Model, rename={"user_id": "userId", "last_fm": "lastFm", "my_space": "mySpace"}):
+    """setlist.fm ``user`` (swagger ``json_User``)."""
+
+    user_id: str = ""
+    fullname: str = ""
+    last_fm: str = ""
+    my_space: str = ""
+    twitter: str = ""
+    flickr: str = ""
+    website: str = ""
+    about: str = ""
+    url: str = ""
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> User:
+        get = d.get
+        return cls(
+            v.strip() if (v := get("userId")).__class__ is str else _str(v),
+            v.strip() if (v := get("fullname")).__class__ is str else _str(v),
+            v.strip() if (v := get("lastFm")).__class__ is str else _str(v),
+            v.strip() if (v := get("mySpace")).__class__ is str else _str(v),
+            v.strip() if (v := get("twitter")).__class__ is str else _str(v),
+            v.strip() if (v := get("flickr")).__class__ is str else _str(v),
+            v.strip() if (v := get("website")).__class__ is str else _str(v),
+            v.strip() if (v := get("about")).__class__ is str else _str(v),
+            v.strip() if (v := get("url")).__class__ is str else _str(v),
+        )
+
+
+@_model
+class Venues(_Model, rename={"items_per_page": "itemsPerPage"}):
+    """setlist.fm ``venues`` (swagger ``json_Venues``)."""
+
+    venue: tuple[Venue, ...] = ()
+    total: int = 0
+    page: int = 0
+    items_per_page: int = 0
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> Venues:
+        get = d.get
+        return cls(
+            tuple(map(Venue.from_json, get("venue") or ())),
+            _int(get("total")),
+            _int(get("page")),
+            _int(get("itemsPerPage")),
+        )
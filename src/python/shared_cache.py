@@ -0,0 +1,150 @@
+"""Cache tier shared by the replicas of the MCP server.
+
+The in-process ``ResponseCache`` (``upstream_cache.py``) only helps the
+replica that filled it: behind APIM, every replica pays its own setlist.fm
+misses. ``SharedCache`` is the second tier, a key/value store of opaque bytes
+reachable from all replicas:
+
+- ``get``/``set`` store serialized responses with a TTL;
+- ``acquire_lease``/``release_lease`` give one replica at a time the right to
+  fetch a missing key upstream (a set-if-absent key with a short TTL, like
+  ``SET key owner NX PX ttl`` in Redis), the others wait for its result in the
+  shared tier instead of sending the same request.
+
+``SQLiteSharedCache`` implements it on an SQLite file, enough for replicas on
+one host or a shared volume and for local tests; a Redis or Azure Managed
+Redis client implements the same four coroutines for a real deployment.
+``shared_cache_from_url`` picks the backend from ``SHARED_CACHE_URL``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SharedCache(ABC):
+    """Interface of a cache tier shared between processes; expiries are wall-clock."""
+
+    name = "none"
+
+    def __init__(self):
+        # Identifies this process as a lease owner.
+        self.owner = uuid.uuid4().hex
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """The value stored under ``key``, ``None`` when missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+
+    @abstractmethod
+    async def acquire_lease(self, key: str, ttl: float) -> bool:
+        """Take the lease on ``key`` for ``ttl`` seconds unless another owner holds it."""
+
+    @abstractmethod
+    async def release_lease(self, key: str) -> None:
+        """Give up the lease on ``key`` if this process holds it."""
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteSharedCache(SharedCache):
+    """``SharedCache`` on an SQLite file, usable by several processes at once."""
+
+    name = "sqlite"
+
+    # Expired rows are purged every so many writes.
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: Path):
+        super().__init__()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                self._db.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+    def _acquire_lease(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)", (key, self.owner, now + ttl)
+            )
+            return cursor.rowcount == 1
+
+    def _release_lease(self, key: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def acquire_lease(self, key: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._acquire_lease, key, ttl)
+
+    async def release_lease(self, key: str) -> None:
+        await asyncio.to_thread(self._release_lease, key)
+
+    async def close(self) -> None:
+        self._db.close()
+
+
+def shared_cache_from_url(url: Optional[str] = SHARED_CACHE_URL) -> Optional[SharedCache]:
+    """``sqlite:///data/cache.db`` (path ``/data/cache.db``) -> ``SQLiteSharedCache``; unset -> no shared tier."""
+    if not url:
+        return None
+    scheme, _, rest = url.partition("://")
+    if scheme == "sqlite":
+        return SQLiteSharedCache(Path(rest))
+    raise ValueError(f"Unsupported SHARED_CACHE_URL scheme '{scheme}', expected sqlite://")
@@ -0,0 +1,133 @@
+"""Pre-serialized responses for the endpoints of the server that never change.
+
+``/health`` and the OAuth metadata documents under ``/.well-known/`` are
+identical for every request, yet Starlette and the auth provider rebuilt and
+re-serialized them each time.
+
+- ``StaticResponse`` is an ASGI endpoint holding the body bytes, an ETag and
+  a ``Cache-Control`` header; ``If-None-Match`` is answered with ``304``.
+- ``StaticResponseMiddleware`` captures the first successful ``GET`` of the
+  OAuth metadata routes generated by the auth provider and replays the bytes.
+  Those routes are wrapped in the SDK's CORS middleware, whose headers depend
+  on the ``Origin`` of the request: responses are captured per origin (and
+  once for requests without one), never replayed across them.
+
+``tools/list`` is left to the MCP server: caching its result in front of the
+SDK handler skipped the fastmcp middleware (auth, tracing) and measured no
+faster than rebuilding it. Clients avoid the request altogether through the
+fingerprinted server version (see ``tool_cache.py``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from serialization import dumpb
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=300")
+
+Headers = List[Tuple[bytes, bytes]]
+ASGIApp = Callable[[dict, Callable, Callable], Awaitable[None]]
+
+# Headers describing one particular response rather than the document.
+_VOLATILE_HEADERS = {b"content-length", b"date", b"server", b"etag", b"cache-control"}
+# Request headers the captured responses vary on (CORS headers follow Origin).
+_KEY_HEADERS = (b"origin",)
+
+
+class StaticResponse:
+    """ASGI endpoint replaying a response built once."""
+
+    __slots__ = ("body", "etag", "_headers", "_not_modified_headers")
+
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str = "application/json",
+        cache_control: str = CACHE_CONTROL,
+        headers: Optional[Headers] = None,
+    ):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        validators = [(b"etag", self.etag.encode()), (b"cache-control", cache_control.encode())]
+        extra = [(k, v) for k, v in headers or [] if k.lower() not in _VOLATILE_HEADERS and k.lower() != b"content-type"]
+        self._headers = [
+            (b"content-type", media_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            *validators,
+            *extra,
+        ]
+        self._not_modified_headers = validators + extra
+
+    @classmethod
+    def json(cls, content: Any, **kwargs: Any) -> StaticResponse:
+        return cls(dumpb(content), **kwargs)
+
+    def matches(self, if_none_match: bytes) -> bool:
+        """True when an ``If-None-Match`` header value names this response."""
+        for tag in if_none_match.decode("latin-1").split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        for name, value in scope["headers"]:
+            if name == b"if-none-match" and self.matches(value):
+                await send({"type": "http.response.start", "status": 304, "headers": self._not_modified_headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+        await send({"type": "http.response.start", "status": 200, "headers": self._headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else self.body})
+
+
+class StaticResponseMiddleware:
+    """Serve ``GET`` responses under ``prefixes`` from bytes captured on first use."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        prefixes: Iterable[str] = ("/.well-known/",),
+        cache_control: str = CACHE_CONTROL,
+        max_entries: int = 256,
+    ):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.cache_control = cache_control
+        # Bounds the variants captured for arbitrary Origin values; later ones pass through.
+        self.max_entries = max_entries
+        self._responses: Dict[Tuple[Any, ...], StaticResponse] = {}
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope["headers"])
+        key = (scope["path"], scope.get("query_string", b""), *(request_headers.get(name) for name in _KEY_HEADERS))
+        cached = self._responses.get(key)
+        if cached is not None:
+            await cached(scope, receive, send)
+            return
+
+        start: dict = {}
+        chunks: List[bytes] = []
+
+        async def capture(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        if start.get("status") == 200 and scope["method"] == "GET" and len(self._responses) < self.max_entries:
+            headers = start.get("headers", [])
+            media_type = next((v.decode() for k, v in headers if k.lower() == b"content-type"), "application/json")
+            self._responses[key] = StaticResponse(b"".join(chunks), media_type, self.cache_control, headers)
+            logger.info("Caching static response for %s", scope["path"])
+
@@ -0,0 +1,154 @@
+"""Typed structured content for the setlist.fm tools generated by ``FastMCP.from_openapi``.
+
+The generated tools already return the upstream JSON as ``structuredContent``,
+but every result also carries the same document serialized a second time in a
+text block, so each page crosses the wire twice and clients end up calling
+``json.loads`` on ``content[0].text``.
+
+- ``apply_output_schema`` is an ``mcp_component_fn`` that attaches the output
+  schema of each operation, derived from the definitions of
+  ``src/apim/setlistfm/swagger.json``.
+- ``StructuredContentMiddleware`` replaces the duplicated JSON text block
+  with a one-line summary. Clients that negotiated a protocol version older
+  than ``STRUCTURED_CONTENT_VERSION``, which introduced ``structuredContent``,
+  keep the JSON text: they would not see the data otherwise. So do all
+  clients with ``SETLISTFM_TEXT_FALLBACK=json``, for hosts that only pass
+  ``content`` to the model whatever their version.
+- ``text_content`` builds that text block; the middleware rewrites it on the
+  results the middlewares of the server answer themselves too.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from mcp.types import TextContent
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+SWAGGER_PATH = Path(__file__).resolve().parent.parent / "apim" / "setlistfm" / "swagger.json"
+
+# "summary" sends a short text block next to structuredContent, "json" keeps
+# the full JSON text for every client.
+TEXT_FALLBACK = os.getenv("SETLISTFM_TEXT_FALLBACK", "summary").lower()
+# First MCP protocol version with structuredContent and tool output schemas.
+STRUCTURED_CONTENT_VERSION = "2025-06-18"
+
+_SCHEMA_KEYS = {"type", "title", "description", "properties", "items", "$ref", "format", "enum"}
+
+
+def _clean(schema: Any) -> Any:
+    """Keep the JSON Schema keywords of a swagger 2.0 schema and point refs at ``$defs``."""
+    if isinstance(schema, list):
+        return [_clean(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    cleaned = {}
+    for key, value in schema.items():
+        if key not in _SCHEMA_KEYS:
+            continue
+        if key == "$ref":
+            cleaned[key] = value.replace("#/definitions/", "#/$defs/")
+        elif key == "properties":
+            cleaned[key] = {name: _clean(prop) for name, prop in value.items()}
+        else:
+            cleaned[key] = _clean(value)
+    return cleaned
+
+
+def load_output_schemas(swagger_path: Path = SWAGGER_PATH) -> dict[str, dict[str, Any]]:
+    """Map each operationId of the swagger document to the schema of its 200 response."""
+    swagger = loads(swagger_path.read_bytes())
+    definitions = {name: _clean(schema) for name, schema in swagger["definitions"].items() if name.startswith("json_")}
+
+    # The JSON payload nests the sets of a setlist as {"sets": {"set": [...]}}
+    # whereas the swagger definition documents a flat "set" array.
+    setlist = definitions.get("json_Setlist", {}).get("properties", {})
+    if "set" in setlist:
+        setlist["sets"] = {"type": "object", "properties": {"set": setlist.pop("set")}}
+
+    # fastmcp clients turn output schemas into dataclasses, which cannot have a
+    # field named after the "with" keyword; it stays allowed as an extra property.
+    definitions.get("json_Song", {}).get("properties", {}).pop("with", None)
+
+    schemas: dict[str, dict[str, Any]] = {}
+    for operations in swagger.get("paths", {}).values():
+        for operation in operations.values():
+            ref = operation.get("responses", {}).get("200", {}).get("schema", {}).get("$ref", "")
+            definition = ref.rsplit("/", 1)[-1]
+            if not operation.get("operationId") or definition not in definitions:
+                continue
+            schema = copy.deepcopy(definitions[definition])
+            schema["$defs"] = definitions
+            schemas[operation["operationId"]] = schema
+    return schemas
+
+
+def _load_or_empty() -> dict[str, dict[str, Any]]:
+    try:
+        return load_output_schemas()
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Output schemas not loaded from %s: %s", SWAGGER_PATH, exc)
+        return {}
+
+
+OUTPUT_SCHEMAS = _load_or_empty()
+
+
+def apply_output_schema(route: Any, component: Any) -> None:
+    """``mcp_component_fn`` setting the swagger-derived output schema on generated tools."""
+    schema = OUTPUT_SCHEMAS.get(getattr(route, "operation_id", None) or "")
+    if schema is not None and hasattr(component, "output_schema"):
+        component.output_schema = schema
+
+
+def summarize(structured: dict[str, Any]) -> str:
+    """One line describing a setlist.fm document, e.g. ``setlist: 20 of 311 (page 1)``."""
+    for key, value in structured.items():
+        if isinstance(value, list):
+            total = structured.get("total", len(value))
+            page = structured.get("page")
+            suffix = f" (page {page})" if page else ""
+            return f"{key}: {len(value)} of {total}{suffix} in structuredContent"
+    name = structured.get("name") or structured.get("id") or structured.get("userId")
+    return f"{name} in structuredContent" if name else "result in structuredContent"
+
+
+def text_content(structured: dict[str, Any], text_fallback: str = TEXT_FALLBACK) -> list[TextContent]:
+    """Text block sent next to ``structured``: its JSON, or its summary for ``"summary"``."""
+    text = summarize(structured) if text_fallback == "summary" else dumps(structured)
+    return [TextContent(type="text", text=text)]
+
+
+def client_protocol_version(context: MiddlewareContext) -> str:
+    """Protocol version the client of the current session negotiated, ``""`` when unknown."""
+    try:
+        params = context.fastmcp_context.session.client_params
+    except (AttributeError, RuntimeError):
+        return ""
+    return params.protocolVersion if params is not None else ""
+
+
+class StructuredContentMiddleware(Middleware):
+    """Send a summary instead of the JSON text copy to clients that read structured results."""
+
+    def __init__(self, text_fallback: str = TEXT_FALLBACK):
+        self.text_fallback = text_fallback
+
+    def text_fallback_for(self, context: MiddlewareContext) -> str:
+        version = client_protocol_version(context)
+        return "json" if version and str(version) < STRUCTURED_CONTENT_VERSION else self.text_fallback
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        result = await call_next(context)
+        structured = getattr(result, "structured_content", None)
+        if isinstance(structured, dict):
+            result.content = text_content(structured, self.text_fallback_for(context))
+        return result
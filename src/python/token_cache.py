@@ -0,0 +1,199 @@
+"""Persistent, encrypted-at-rest token cache shared by the Entra ID demo clients.
+
+Every run of ``mcp_client_entra_id.py`` / ``mcp_client_auth_entra_id.py``
+used to acquire a new token, and ``AzureCliCredential`` spawns the ``az`` CLI
+each time. Tokens are now kept on disk between runs:
+
+- MSAL applications get a ``PersistedTokenCache`` (MSAL keys it by client,
+  tenant and scope itself);
+- ``azure.identity.aio`` credentials are wrapped in ``AsyncCachedCredential``,
+  which stores one access token per credential kind, identity, tenant and
+  scope. The identity is the client id of application credentials and the
+  signed-in account of ``AzureCliCredential`` (read from the CLI profile, no
+  ``az`` process); a credential whose identity cannot be told before
+  acquiring a token (``DefaultAzureCredential``) is not cached unless the
+  caller names it with ``identity=``.
+
+Storage uses msal-extensions (already an azure-identity dependency): DPAPI on
+Windows, the Keychain on macOS and libsecret on Linux, with a cross-process
+file lock so parallel runs do not corrupt the file. Where no encryption
+backend exists (headless Linux, dev containers) the cache is disabled unless
+``TOKEN_CACHE_ALLOW_UNENCRYPTED=true`` opts into a plain file readable only by
+the current user, mirroring azure-identity's ``allow_unencrypted_storage``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from azure.core.credentials import AccessToken
+from msal_extensions import CrossPlatLock, FilePersistence, PersistedTokenCache, build_encrypted_persistence
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.getenv("TOKEN_CACHE_DIR", Path.home() / ".IdentityService"))
+ALLOW_UNENCRYPTED = os.getenv("TOKEN_CACHE_ALLOW_UNENCRYPTED", "false").lower() == "true"
+
+# Tokens closer than this to expiry are not reused.
+EXPIRY_MARGIN = 300
+# Part of every key; entries written with another key format are dropped.
+KEY_VERSION = "v2"
+
+
+def build_persistence(name: str, allow_unencrypted: bool = ALLOW_UNENCRYPTED) -> Optional[Any]:
+    """Return an msal-extensions persistence for ``name``, or ``None`` when unavailable."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    location = str(CACHE_DIR / name)
+    try:
+        persistence = build_encrypted_persistence(location)
+        # libsecret may be importable but have no keyring to talk to; fail here, not mid-run.
+        if os.path.exists(location):
+            persistence.load()
+        else:
+            persistence.save("{}")
+        return persistence
+    except Exception as exc:
+        if not allow_unencrypted:
+            logger.warning("Token cache disabled, no encrypted storage available: %s", exc)
+            return None
+        logger.warning("Encrypted storage unavailable (%s), using a user-only plain file", exc)
+        if not os.path.exists(location):
+            # Created user-only rather than chmod-ed afterwards, so it is never readable by others.
+            with os.fdopen(os.open(location, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as file:
+                file.write("{}")
+        return FilePersistence(location)
+
+
+def msal_token_cache(name: str = "mcp-azure-apim.msal.cache") -> Optional[PersistedTokenCache]:
+    """Persistent cache for ``msal.ConfidentialClientApplication(token_cache=...)``."""
+    persistence = build_persistence(name)
+    return PersistedTokenCache(persistence) if persistence is not None else None
+
+
+def azure_cli_account() -> str:
+    """Account signed in to the Azure CLI, from ``azureProfile.json``; ``""`` when unknown."""
+    config_dir = Path(os.getenv("AZURE_CONFIG_DIR", Path.home() / ".azure"))
+    try:
+        profile = loads((config_dir / "azureProfile.json").read_bytes().decode("utf-8-sig"))
+    except (OSError, ValueError):
+        return ""
+    subscriptions = profile.get("subscriptions") or []
+    current = next((sub for sub in subscriptions if sub.get("isDefault")), None)
+    user = (current or {}).get("user") or {}
+    return f"{user.get('type', 'user')}:{user['name']}" if user.get("name") else ""
+
+
+def credential_identity(credential: Any) -> str:
+    """Whom the tokens of ``credential`` are issued to; ``""`` when it cannot be told upfront."""
+    client_id = getattr(credential, "_client_id", None)
+    if client_id:
+        return f"app:{client_id}"
+    if type(credential).__name__ == "AzureCliCredential":
+        return azure_cli_account()
+    return ""
+
+
+class AccessTokenCache:
+    """File-locked store of access tokens keyed by credential kind, identity, tenant and scope."""
+
+    def __init__(self, name: str = "mcp-azure-apim.tokens.cache"):
+        self.name = name
+        self._persistence: Optional[Any] = None
+        self._opened = False
+        self._open_lock = threading.Lock()
+        self._lock_path = str(CACHE_DIR / f"{name}.lockfile")
+
+    def open(self) -> None:
+        """Open (or create) the persistence; blocking, async callers run it in a thread."""
+        with self._open_lock:
+            if not self._opened:
+                self._persistence = build_persistence(self.name)
+                self._opened = True
+
+    @staticmethod
+    def key(kind: str, identity: str, tenant_id: str, scope: str) -> str:
+        return f"{KEY_VERSION}|{kind}|{identity}|{tenant_id or 'default'}|{scope}"
+
+    def _load(self) -> dict:
+        try:
+            return loads(self._persistence.load() or "{}")
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[AccessToken]:
+        self.open()
+        if self._persistence is None:
+            return None
+        with CrossPlatLock(self._lock_path):
+            entry = self._load().get(key)
+        if entry and entry["expires_on"] - EXPIRY_MARGIN > time.time():
+            return AccessToken(entry["token"], entry["expires_on"])
+        return None
+
+    def put(self, key: str, token: AccessToken) -> None:
+        self.open()
+        if self._persistence is None:
+            return
+        with CrossPlatLock(self._lock_path):
+            now = time.time()
+            entries = {
+                k: v for k, v in self._load().items() if k.startswith(f"{KEY_VERSION}|") and v["expires_on"] > now
+            }
+            entries[key] = {"token": token.token, "expires_on": token.expires_on}
+            self._persistence.save(dumps(entries))
+
+
+class AsyncCachedCredential:
+    """Wrap an ``azure.identity.aio`` credential so its tokens survive across processes.
+
+    Opening the persistence and the locked file access run in a worker thread
+    (``__aenter__`` opens it upfront) so they never stall the loop.
+    """
+
+    def __init__(
+        self,
+        credential: Any,
+        tenant_id: str = "",
+        cache: Optional[AccessTokenCache] = None,
+        identity: Optional[str] = None,
+    ):
+        self._credential = credential
+        self._kind = type(credential).__name__
+        self._tenant_id = tenant_id
+        self._cache = cache or AccessTokenCache()
+        # None until resolved by credential_identity(), "" when it cannot be.
+        self._identity = identity
+
+    async def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        if self._identity is None:
+            self._identity = await asyncio.to_thread(credential_identity, self._credential)
+            if not self._identity:
+                logger.info("Not caching %s tokens, their identity is unknown before acquiring one", self._kind)
+        if not self._identity:
+            return await self._credential.get_token(*scopes, **kwargs)
+        key = self._cache.key(self._kind, self._identity, kwargs.get("tenant_id") or self._tenant_id, " ".join(scopes))
+        token = await asyncio.to_thread(self._cache.get, key)
+        if token is not None:
+            logger.info("Reusing cached %s token for %s", self._kind, " ".join(scopes))
+            return token
+        token = await self._credential.get_token(*scopes, **kwargs)
+        await asyncio.to_thread(self._cache.put, key, token)
+        return token
+
+    async def close(self) -> None:
+        await self._credential.close()
+
+    async def __aenter__(self) -> AsyncCachedCredential:
+        await asyncio.to_thread(self._cache.open)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
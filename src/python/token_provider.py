@@ -0,0 +1,204 @@
+"""Shared access-token provider for the MCP clients.
+
+``TokenProvider`` wraps any token source (a raw Entra ID client-credentials
+POST, an azure-identity credential, MSAL...) and guarantees that:
+
+- concurrent callers arriving after expiry trigger a single refresh
+  (single-flight), the others wait for its result;
+- a background task renews the token at a fraction of its lifetime, so callers
+  are served from cache and never block on Entra ID;
+- the renewal time is jittered per process, so replicas started together do
+  not refresh in lockstep;
+- refresh latency and failures are recorded as OpenTelemetry metrics (and in
+  ``stats`` for clients without an exporter).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from azure.core.credentials import AccessToken
+from opentelemetry import metrics
+
+from serialization import loads
+
+logger = logging.getLogger(__name__)
+
+meter = metrics.get_meter("token_provider")
+refresh_duration = meter.create_histogram(
+    "token.refresh.duration", unit="ms", description="Latency of access-token refreshes"
+)
+refresh_failures = meter.create_counter(
+    "token.refresh.failures", description="Access-token refreshes that raised an error"
+)
+
+TokenFetcher = Callable[[], Awaitable[AccessToken]]
+
+
+async def _credential_token(credential: Any, scope: str) -> AccessToken:
+    """Call ``get_token`` without blocking the loop, whether the credential is sync or async."""
+    if inspect.iscoroutinefunction(credential.get_token):
+        return await credential.get_token(scope)
+    return await asyncio.to_thread(credential.get_token, scope)
+
+
+class TokenProvider:
+    """Caches one access token and keeps it fresh."""
+
+    def __init__(
+        self,
+        fetch: TokenFetcher,
+        name: str = "default",
+        refresh_ratio: float = 0.75,
+        jitter: float = 0.1,
+        expiry_margin: float = 60.0,
+        retry_delay: float = 5.0,
+    ):
+        """
+        Args:
+            fetch: Coroutine function returning a fresh ``AccessToken``
+            name: Label used in logs and metric attributes (e.g. the scope)
+            refresh_ratio: Fraction of the token lifetime after which the
+                background task renews it
+            jitter: Random fraction (+/-) applied to the refresh time
+            expiry_margin: Seconds before expiry after which a cached token is
+                no longer handed out
+            retry_delay: Initial back-off of the background task after a
+                failed refresh (doubles up to one minute)
+        """
+        self._fetch = fetch
+        self.name = name
+        self.refresh_ratio = refresh_ratio
+        self.jitter = jitter
+        self.expiry_margin = expiry_margin
+        self.retry_delay = retry_delay
+        self._token: Optional[AccessToken] = None
+        self._issued_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._random = random.Random()
+        self.stats: Dict[str, Any] = {"refreshes": 0, "failures": 0, "last_refresh_ms": None}
+
+    @classmethod
+    def from_credential(cls, credential: Any, scope: str, **kwargs: Any) -> TokenProvider:
+        """Build a provider from a sync or async (``azure.identity.aio``) credential."""
+
+        async def fetch() -> AccessToken:
+            return await _credential_token(credential, scope)
+
+        return cls(fetch, name=scope, **kwargs)
+
+    @classmethod
+    def client_credentials(
+        cls,
+        http: Callable[[], httpx.AsyncClient],
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        scope: str,
+        **kwargs: Any,
+    ) -> TokenProvider:
+        """Build a provider running the client-credentials flow against Entra ID.
+
+        ``http`` returns the (pooled) client used for the token POST.
+        """
+        token_url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "scope": scope,
+        }
+
+        async def fetch() -> AccessToken:
+            response = await http().post(token_url, data=data)
+            response.raise_for_status()
+            token_data = loads(response.content)
+            return AccessToken(token_data["access_token"], int(time.time() + int(token_data.get("expires_in", 3600))))
+
+        return cls(fetch, name=scope, **kwargs)
+
+    def _is_valid(self) -> bool:
+        return self._token is not None and time.time() < self._token.expires_on - self.expiry_margin
+
+    async def get_token(self) -> str:
+        """Return a valid access token, refreshing it at most once for all waiters."""
+        if self._is_valid():
+            return self._token.token  # type: ignore[union-attr]
+        return (await self._refresh()).token
+
+    async def _refresh(self, stale_before: float = 0.0) -> AccessToken:
+        """Fetch a new token unless a valid one issued after ``stale_before`` is cached."""
+        async with self._lock:
+            # Another caller may have refreshed while this one waited on the lock.
+            if self._is_valid() and self._issued_at >= stale_before:
+                return self._token  # type: ignore[return-value]
+            start = time.perf_counter()
+            attributes = {"token.name": self.name}
+            try:
+                token = await self._fetch()
+            except Exception:
+                self.stats["failures"] += 1
+                refresh_failures.add(1, attributes)
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                refresh_duration.record(elapsed_ms, attributes)
+                self.stats["last_refresh_ms"] = round(elapsed_ms, 1)
+            self._token = token
+            self._issued_at = time.time()
+            self.stats["refreshes"] += 1
+            logger.info("Refreshed access token for %s in %.0f ms", self.name, elapsed_ms)
+            return token
+
+    def _next_refresh_delay(self) -> float:
+        if self._token is None:
+            return 0.0
+        lifetime = max(self._token.expires_on - self._issued_at, 0.0)
+        spread = 1 + self._random.uniform(-self.jitter, self.jitter)
+        refresh_at = self._issued_at + lifetime * self.refresh_ratio * spread
+        # Never schedule past the point where get_token would refresh in the foreground.
+        refresh_at = min(refresh_at, self._token.expires_on - self.expiry_margin)
+        return max(refresh_at - time.time(), 1.0)
+
+    async def _refresh_loop(self) -> None:
+        delay = self.retry_delay
+        while True:
+            await asyncio.sleep(self._next_refresh_delay())
+            try:
+                await self._refresh(stale_before=time.time())
+                delay = self.retry_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Background refresh of %s failed, retrying in %.0fs: %s", self.name, delay, exc)
+                await asyncio.sleep(delay * (1 + self._random.uniform(0, self.jitter)))
+                delay = min(delay * 2, 60.0)
+
+    def start(self) -> None:
+        """Start the background refresh task on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(), name=f"token-refresh:{self.name}")
+
+    async def aclose(self) -> None:
+        """Stop the background refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> TokenProvider:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,154 @@
+"""Persistent cache of MCP tool listings for the demo clients.
+
+Every run used to call ``tools/list`` and receive the full input and output
+schemas of the ~15 generated setlist.fm tools, which the server regenerates
+for each session. ``ToolListCache`` keeps the listing on disk, keyed by
+endpoint and by the ``serverInfo`` name and version returned at initialize,
+so a new session only pays for the listing when something changed:
+
+- the setlist.fm server advertises ``<version>+<fingerprint>``, where the
+  fingerprint (``server_tools_fingerprint``) hashes its ``tools/list`` result,
+  generated and hand-written tools alike, computed at startup: any change to
+  a tool changes the key, with no version to bump by hand;
+- a ``notifications/tools/list_changed`` received during the session (the
+  cache is also a fastmcp ``MessageHandler``) marks the listing stale;
+- entries older than ``max_age`` are refetched, for servers whose version
+  does not follow their tools;
+- a cached listing also fills the output schemas of the session, so the first
+  ``call_tool`` does not send ``tools/list`` to validate its result. Those
+  live in a private dict of the MCP SDK's ``ClientSession``: it is only
+  written for the SDK versions known to have it (``SESSION_SCHEMAS_SDK``),
+  other versions simply list the tools again on the first call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import mcp.types
+from fastmcp import FastMCP
+from fastmcp.client import Client
+from fastmcp.client.messages import MessageHandler
+
+from serialization import dumpb, loads
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(os.getenv("TOOL_CACHE_PATH", Path.home() / ".cache" / "mcp-azure-apim" / "tools.json"))
+MAX_AGE = float(os.getenv("TOOL_CACHE_MAX_AGE", 24 * 3600))
+# mcp versions whose ClientSession keeps output schemas in ``_tool_output_schemas``: [min, max).
+SESSION_SCHEMAS_SDK = ((1, 10), (2, 0))
+
+
+def listing_fingerprint(*parts: Any) -> str:
+    """Short stable hash of the JSON-serializable inputs a tool listing is generated from."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(dumpb(part, sort_keys=True))
+    return digest.hexdigest()[:12]
+
+
+async def server_tools_fingerprint(server: FastMCP) -> str:
+    """Fingerprint of the tools ``server`` lists, as sent to clients."""
+    tools = await server.get_tools()
+    listing = [tool.to_mcp_tool(name=key).model_dump(mode="json", by_alias=True, exclude_none=True) for key, tool in sorted(tools.items())]
+    return listing_fingerprint(listing)
+
+
+def _sdk_version() -> tuple:
+    try:
+        return tuple(int(part) for part in re.findall(r"\d+", importlib.metadata.version("mcp"))[:2])
+    except importlib.metadata.PackageNotFoundError:
+        return ()
+
+
+class ToolListCache(MessageHandler):
+    """``list_tools`` served from disk while the server identity is unchanged."""
+
+    def __init__(self, path: Path = CACHE_PATH, max_age: float = MAX_AGE):
+        """
+        Args:
+            path: JSON file holding the cached listings
+            max_age: Seconds after which a listing is refetched regardless
+        """
+        super().__init__()
+        self.path = path
+        self.max_age = max_age
+        self._stale = False
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(endpoint: str, server_info: mcp.types.Implementation) -> str:
+        return f"{endpoint}|{server_info.name}|{server_info.version}"
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            return loads(self.path.read_bytes())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(dumpb(entries))
+        # Atomic on POSIX and Windows, so concurrent runs never read half a file.
+        os.replace(tmp, self.path)
+
+    async def on_tool_list_changed(self, message: mcp.types.ToolListChangedNotification) -> None:
+        logger.info("Server tool list changed, cached listing is stale")
+        self._stale = True
+
+    async def list_tools(self, client: Client, endpoint: str) -> List[mcp.types.Tool]:
+        """Return the tools of the connected ``client``, from disk when still valid."""
+        if client.initialize_result is None:
+            return await client.list_tools()
+        key = self.key(endpoint, client.initialize_result.serverInfo)
+        entries = self._load()
+        entry = entries.get(key)
+        if entry is not None and not self._stale and time.time() - entry["stored_at"] < self.max_age:
+            self.stats["hits"] += 1
+            logger.info("Using cached tool listing for %s", key)
+            tools = [mcp.types.Tool.model_validate(tool) for tool in entry["tools"]]
+            self._prime_output_schemas(client, tools)
+            return tools
+
+        self.stats["misses"] += 1
+        tools = await client.list_tools()
+        self._stale = False
+        now = time.time()
+        # Drop expired entries and older versions of the same server.
+        prefix = key.rsplit("|", 1)[0] + "|"
+        entries = {k: v for k, v in entries.items() if now - v["stored_at"] < self.max_age and not k.startswith(prefix)}
+        entries[key] = {
+            "stored_at": now,
+            "tools": [tool.model_dump(mode="json", by_alias=True, exclude_none=True) for tool in tools],
+        }
+        self._save(entries)
+        return tools
+
+    @staticmethod
+    def _prime_output_schemas(client: Client, tools: List[mcp.types.Tool]) -> None:
+        """Hand the cached output schemas to the session, as a fetched listing would.
+
+        ``ClientSession`` and fastmcp's ``Client`` look the output schema of a tool
+        up there before validating its result, and call ``tools/list`` when it is
+        missing, which would undo the cache on the first ``call_tool``.
+        """
+        low, high = SESSION_SCHEMAS_SDK
+        schemas = getattr(client.session, "_tool_output_schemas", None)
+        if not low <= _sdk_version() < high or not isinstance(schemas, dict):
+            logger.warning("Untested MCP SDK version, tools/list will be called again to validate tool results")
+            return
+        for tool in tools:
+            schemas[tool.name] = tool.outputSchema
+
+    def invalidate(self) -> None:
+        """Force the next ``list_tools`` to fetch from the server."""
+        self._stale = True
@@ -0,0 +1,383 @@
+"""Caching in front of the setlist.fm API, at the httpx transport level.
+
+The tools generated from the OpenAPI spec send their requests through the
+server's ``httpx.AsyncClient``; ``CachingTransport`` sits in that client's
+transport chain so every tool benefits without knowing about it.
+
+Successful ``GET`` responses are kept for ``RESPONSE_CACHE_TTL`` seconds in a
+bounded in-process LRU (``ResponseCache``); ``cache_warmer.py`` fills it before
+a new replica reports ready.
+
+Agents often guess identifiers, and each guess costs a round trip and a slot
+of the setlist.fm rate limit only to get a 404:
+
+- identifiers are validated locally first: MBIDs are UUIDs, setlist and venue
+  IDs are hexadecimal, city IDs are GeoNames numbers. A malformed one is
+  answered in-process with the same ``400`` JSON error as setlist.fm;
+- ``404`` responses are remembered for ``NEGATIVE_CACHE_TTL`` seconds (keyed by
+  URL) and replayed, so the same wrong ID is only asked upstream once.
+
+Expired entries are revalidated rather than refetched: the ``ETag`` and
+``Last-Modified`` validators of a response are stored with it and sent back as
+``If-None-Match``/``If-Modified-Since``. A ``304`` renews the entry for another
+TTL and the stored body is replayed, without transferring or decoding it again.
+
+With a ``SharedCache`` (``shared_cache.py``, ``SHARED_CACHE_URL``) as second
+tier, replicas share their responses: an L1 miss reads the shared tier, and a
+miss there takes a lease on the key so only one replica fetches it while the
+others poll for its result. Entries cross the tier in a compact binary form
+(``CachedResponse.to_bytes``): a fixed ``struct`` header, the few stored
+headers and the body, zlib-compressed from ``COMPRESS_MIN_BYTES``.
+
+``upstream_cache.avoided`` counts the requests answered without an upstream
+call, by ``reason`` (``hit``, ``negative_hit``, ``shared_hit``, ``coalesced``,
+``invalid_id``); ``upstream_cache.revalidations`` counts conditional requests
+by ``outcome`` (``not_modified`` or ``modified``) and
+``upstream_cache.lease_waits`` the waits on another replica's fetch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+from opentelemetry import metrics
+
+from serialization import dumpb
+from shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "900"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+SHARED_CACHE_STALE_TTL = float(os.getenv("SHARED_CACHE_STALE_TTL", "86400"))
+# A replica holding a lease has LEASE_TTL seconds to fetch; the others wait at most LEASE_WAIT.
+LEASE_TTL = float(os.getenv("SHARED_CACHE_LEASE_TTL", "10"))
+LEASE_WAIT = float(os.getenv("SHARED_CACHE_LEASE_WAIT", "5"))
+LEASE_POLL_INTERVAL = 0.05
+# Bodies from this size are stored zlib-compressed in the shared tier.
+COMPRESS_MIN_BYTES = 512
+
+meter = metrics.get_meter("upstream_cache")
+avoided = meter.create_counter("upstream_cache.avoided", description="setlist.fm requests answered without an upstream call")
+lease_waits = meter.create_counter(
+    "upstream_cache.lease_waits", description="Waits for a response fetched by another replica, by outcome"
+)
+revalidations = meter.create_counter(
+    "upstream_cache.revalidations", description="Conditional requests for expired cache entries, by outcome"
+)
+
+_MBID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+_HEX_ID = re.compile(r"^[0-9a-f]{1,16}$", re.IGNORECASE)
+_GEO_ID = re.compile(r"^\d{1,12}$")
+
+# Identifier kind -> (pattern, description used in the error message).
+_FORMATS = {
+    "mbid": (_MBID, "a MusicBrainz MBID (UUID)"),
+    "setlistId": (_HEX_ID, "a setlist.fm setlist ID (hexadecimal)"),
+    "venueId": (_HEX_ID, "a setlist.fm venue ID (hexadecimal)"),
+    "geoId": (_GEO_ID, "a GeoNames city ID (digits)"),
+}
+# Path templates of the setlist.fm API and the kind of their identifier.
+_PATHS = [
+    (re.compile(r"/1\.0/artist/([^/]+)(?:/setlists)?$"), "mbid"),
+    (re.compile(r"/1\.0/setlist/(?!version/)([^/]+)$"), "setlistId"),
+    (re.compile(r"/1\.0/venue/([^/]+)(?:/setlists)?$"), "venueId"),
+    (re.compile(r"/1\.0/city/([^/]+)$"), "geoId"),
+]
+# Search query parameters carrying identifiers.
+_PARAMS = {"artistMbid": "mbid", "venueId": "venueId", "cityId": "geoId"}
+
+
+def is_mbid(value: str) -> bool:
+    return bool(_MBID.match(value))
+
+
+def invalid_identifier(request: httpx.Request) -> Optional[str]:
+    """Error message if ``request`` carries a malformed identifier, else ``None``."""
+    path = request.url.path
+    for pattern, kind in _PATHS:
+        match = pattern.search(path)
+        if match:
+            checks = [(kind, match.group(1))]
+            break
+    else:
+        checks = []
+    checks += [(kind, request.url.params[name]) for name, kind in _PARAMS.items() if request.url.params.get(name)]
+    for kind, value in checks:
+        regex, description = _FORMATS[kind]
+        if not regex.match(value):
+            return f"'{value}' is not {description}"
+    return None
+
+
+def cache_key(request: httpx.Request) -> str:
+    """Method and URL, query parameters sorted."""
+    params = sorted(request.url.params.multi_items())
+    return f"{request.method} {request.url.copy_with(query=None)}?{httpx.QueryParams(params)}"
+
+
+# Format version, status code, wall-clock expiry, number of headers.
+_ENTRY_HEADER = struct.Struct("<BHdH")
+_STRING_LENGTHS = struct.Struct("<HH")
+_ENTRY_FORMAT = 1
+
+
+@dataclass
+class CachedResponse:
+    """Decoded body and headers of an upstream response, with its expiry (monotonic).
+
+    ``headers`` keeps the content type and the ``etag``/``last-modified`` validators.
+    """
+
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.monotonic()
+
+    @property
+    def conditional_headers(self) -> Dict[str, str]:
+        """``If-None-Match``/``If-Modified-Since`` revalidating this entry, empty without validators."""
+        headers = {}
+        if "etag" in self.headers:
+            headers["if-none-match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["if-modified-since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(self.status_code, headers=self.headers, content=self.body, request=request)
+
+    def to_bytes(self) -> bytes:
+        """Binary form for the shared tier; the expiry becomes wall-clock time."""
+        expires_at = time.time() + self.expires_at - time.monotonic()
+        parts = [_ENTRY_HEADER.pack(_ENTRY_FORMAT, self.status_code, expires_at, len(self.headers))]
+        for name, value in self.headers.items():
+            name_bytes, value_bytes = name.encode(), value.encode()
+            parts += [_STRING_LENGTHS.pack(len(name_bytes), len(value_bytes)), name_bytes, value_bytes]
+        body, compressed = self.body, False
+        if len(body) >= COMPRESS_MIN_BYTES:
+            packed = zlib.compress(body, 6)
+            if len(packed) < len(body):
+                body, compressed = packed, True
+        parts += [bytes([compressed]), body]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> CachedResponse:
+        version, status_code, expires_at, count = _ENTRY_HEADER.unpack_from(data)
+        if version != _ENTRY_FORMAT:
+            raise ValueError(f"Unknown cache entry format {version}")
+        offset = _ENTRY_HEADER.size
+        headers = {}
+        for _ in range(count):
+            name_length, value_length = _STRING_LENGTHS.unpack_from(data, offset)
+            offset += _STRING_LENGTHS.size
+            name = data[offset : offset + name_length].decode()
+            offset += name_length
+            headers[name] = data[offset : offset + value_length].decode()
+            offset += value_length
+        body = bytes(data[offset + 1 :])
+        if data[offset]:
+            body = zlib.decompress(body)
+        return cls(status_code, headers, body, time.monotonic() + expires_at - time.time())
+
+
+class ResponseCache:
+    """Bounded LRU of upstream responses keyed by ``cache_key``.
+
+    Expired entries with validators stay until evicted, for revalidation.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self.get(key)
+        return entry is not None and entry.fresh
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The entry for ``key``, possibly expired: check ``fresh``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.fresh and not entry.conditional_headers:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """httpx transport validating identifiers and caching 200 and 404 responses."""
+
+    # Status code -> seconds the response is kept.
+    TTLS = {200: RESPONSE_CACHE_TTL, 404: NEGATIVE_CACHE_TTL}
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ResponseCache] = None,
+        shared: Optional[SharedCache] = None,
+    ):
+        """
+        Args:
+            transport: Transport doing the upstream calls, e.g. a ``DeadlineTransport``
+            cache: In-process cache (L1), ``RESPONSE_CACHE_MAX_ENTRIES`` entries by default
+            shared: Cache tier shared with the other replicas (L2), none by default
+        """
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.shared = shared
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            return await self._transport.handle_async_request(request)
+
+        error = invalid_identifier(request)
+        if error is not None:
+            avoided.add(1, {"reason": "invalid_id"})
+            logger.info("Rejected %s locally: %s", request.url.path, error)
+            body = dumpb({"code": 400, "status": "Bad Request", "message": error})
+            return httpx.Response(400, headers={"content-type": "application/json"}, content=body, request=request)
+
+        key = cache_key(request)
+        cached = self.cache.get(key)
+        if cached is not None and cached.fresh:
+            avoided.add(1, {"reason": "hit" if cached.status_code == 200 else "negative_hit"})
+            return cached.to_response(request)
+        if self.shared is None:
+            return await self._fetch(request, key, cached)
+
+        shared_entry = await self._shared_get(key)
+        if shared_entry is not None and shared_entry.fresh:
+            self.cache.put(key, shared_entry)
+            avoided.add(1, {"reason": "shared_hit"})
+            return shared_entry.to_response(request)
+        cached = cached or shared_entry
+
+        # One replica fetches a missing key, the others wait for it in the shared tier.
+        leased = await self._acquire_lease(key)
+        if leased is False:
+            entry = await self._wait_for_peer(key)
+            if entry is not None:
+                self.cache.put(key, entry)
+                avoided.add(1, {"reason": "coalesced"})
+                return entry.to_response(request)
+        try:
+            return await self._fetch(request, key, cached)
+        finally:
+            if leased:
+                await self._release_lease(key)
+
+    async def _fetch(self, request: httpx.Request, key: str, cached: Optional[CachedResponse]) -> httpx.Response:
+        """Upstream request, conditional when ``cached`` has validators; stores the result.
+
+        A request carrying the caller's own validators is sent as is, and its
+        ``304`` goes back to the caller: only validators added here revalidate
+        the cache entry.
+        """
+        own_validators = any(name in request.headers for name in ("if-none-match", "if-modified-since"))
+        conditional = cached.conditional_headers if cached is not None and not own_validators else {}
+        for name, value in conditional.items():
+            request.headers[name] = value
+        response = await self._transport.handle_async_request(request)
+        if conditional:
+            revalidations.add(1, {"outcome": "not_modified" if response.status_code == 304 else "modified"})
+        if response.status_code == 304 and conditional:
+            await response.aclose()
+            cached.expires_at = time.monotonic() + self.TTLS[cached.status_code]
+            for name in ("etag", "last-modified"):
+                if name in response.headers:
+                    cached.headers[name] = response.headers[name]
+            self.cache.put(key, cached)
+            await self._shared_set(key, cached)
+            return cached.to_response(request)
+
+        ttl = self.TTLS.get(response.status_code, 0)
+        if ttl <= 0:
+            return response
+        # Stored decoded: the replayed response carries no Content-Encoding.
+        body = await response.aread()
+        await response.aclose()
+        headers = {"content-type": response.headers.get("content-type", "application/json")}
+        headers.update((name, response.headers[name]) for name in ("etag", "last-modified") if name in response.headers)
+        entry = CachedResponse(response.status_code, headers, body, time.monotonic() + ttl)
+        self.cache.put(key, entry)
+        await self._shared_set(key, entry)
+        return entry.to_response(request)
+
+    # The shared tier is an optimization: its failures degrade to upstream calls.
+
+    async def _shared_get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            data = await self.shared.get(key)
+            return CachedResponse.from_bytes(data) if data is not None else None
+        except Exception as exc:
+            logger.warning("Shared cache read failed: %s", exc)
+            return None
+
+    async def _shared_set(self, key: str, entry: CachedResponse) -> None:
+        if self.shared is None:
+            return
+        # Entries with validators outlive their TTL in the shared tier, for revalidation.
+        keep = entry.expires_at - time.monotonic() + (SHARED_CACHE_STALE_TTL if entry.conditional_headers else 0)
+        try:
+            await self.shared.set(key, entry.to_bytes(), keep)
+        except Exception as exc:
+            logger.warning("Shared cache write failed: %s", exc)
+
+    async def _acquire_lease(self, key: str) -> Optional[bool]:
+        """``True`` if leased, ``False`` if another replica holds it, ``None`` if the tier failed."""
+        try:
+            return await self.shared.acquire_lease(key, LEASE_TTL)
+        except Exception as exc:
+            logger.warning("Shared cache lease failed: %s", exc)
+            return None
+
+    async def _release_lease(self, key: str) -> None:
+        try:
+            await self.shared.release_lease(key)
+        except Exception as exc:
+            logger.warning("Shared cache lease release failed: %s", exc)
+
+    async def _wait_for_peer(self, key: str) -> Optional[CachedResponse]:
+        """Poll the shared tier for the response another replica is fetching."""
+        deadline = time.monotonic() + LEASE_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+            entry = await self._shared_get(key)
+            if entry is not None and entry.fresh:
+                lease_waits.add(1, {"outcome": "filled"})
+                return entry
+        lease_waits.add(1, {"outcome": "timeout"})
+        return None
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+        if self.shared is not None:
+            await self.shared.close()